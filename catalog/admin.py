@@ -1,19 +1,62 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import ValidationError
+from django.http import HttpResponseRedirect
 from .models import Genre, Book, BookInstance, Author, Language
+from . import circulation, lookups, routers
+from .pagination import EstimatedCountPaginator
 
-admin.site.register(Genre)
+
+class ReplicaModelAdmin(admin.ModelAdmin):
+    """Listagem (GET) lida da réplica (ver catalog/routers.py); ações em lote
+       e edições continuam no primário."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        with routers.replica():
+            return routers.rendered(super().changelist_view(request, extra_context))
+
+
+admin.site.register(Genre, ReplicaModelAdmin)
 #admin.site.register(Book)
 #admin.site.register(BookInstance)
 #admin.site.register(Author)
-admin.site.register(Language)
+admin.site.register(Language, ReplicaModelAdmin)
+
+
+class LookupChoicesMixin:
+    """Opções de gênero e idioma da memória (catalog/lookups.py), em vez de
+       uma consulta por campo de cada formulário (ou linha de inline)."""
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if formfield is not None and db_field.related_model in lookups.MODELS:
+            formfield.choices = lookups.choices(db_field.related_model, formfield.empty_label)
+        return formfield
 
-class BookInline(admin.TabularInline):
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_manytomany(db_field, request, **kwargs)
+        if formfield is not None and db_field.related_model in lookups.MODELS:
+            formfield.choices = lookups.choices(db_field.related_model)
+        return formfield
+
+
+class BookChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # Gêneros dos livros da página: tabela de ligação + memória
+        #  (display_genre usa o resultado)
+        lookups.attach(self.result_list, language=False)
+
+
+class BookInline(LookupChoicesMixin, admin.TabularInline):
     model = Book
     extra = 0
 
 @admin.register(Author)
-class AuthorAdmin(admin.ModelAdmin):
+class AuthorAdmin(ReplicaModelAdmin):
     list_display = ('last_name', 'first_name', 'date_of_birth', 'date_of_death')
     fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death')]
     inlines = [BookInline]
@@ -22,25 +65,115 @@ class AuthorAdmin(admin.ModelAdmin):
 class BooksInstanceInline(admin.TabularInline):
     model = BookInstance
     extra = 0
+    ordering = ('due_back',)
+    # Busca o solicitante sob demanda em vez de listar todos os usuários
+    autocomplete_fields = ['borrower']
 
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(LookupChoicesMixin, ReplicaModelAdmin):
     list_display = ('title', 'author', 'display_genre')
+    list_select_related = ('author',)
+    search_fields = ('title', 'isbn')
     inlines = [BooksInstanceInline]
 
+    def get_changelist(self, request, **kwargs):
+        return BookChangeList
+
+
+class BookInstanceAdminForm(forms.ModelForm):
+    """Guarda em campos ocultos a situação e o solicitante da cópia quando o
+       formulário foi aberto; a edição só é aceita se ainda forem esses."""
+    original_status = forms.CharField(widget=forms.HiddenInput, required=False)
+    original_borrower = forms.IntegerField(widget=forms.HiddenInput, required=False)
+
+    ORIGINAL_FIELDS = ('original_status', 'original_borrower')
+
+    class Meta:
+        model = BookInstance
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.instance._state.adding:
+            self.fields['original_status'].initial = self.instance.status
+            self.fields['original_borrower'].initial = self.instance.borrower_id
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.instance._state.adding:
+            return cleaned_data
+        if any(self.add_prefix(name) not in self.data for name in self.ORIGINAL_FIELDS):
+            raise ValidationError('Formulário incompleto: recarregue a página.')
+        # self.instance ainda tem os valores atuais da base (relidos no POST)
+        original = (cleaned_data.get('original_status', ''), cleaned_data.get('original_borrower'))
+        if original != (self.instance.status, self.instance.borrower_id):
+            raise ValidationError(
+                'A cópia foi alterada por outra pessoa depois que o formulário foi '
+                'aberto (situação atual: %(status)s). Recarregue a página.',
+                params={'status': self.instance.get_status_display() or '-'})
+        return cleaned_data
+
 
 @admin.register(BookInstance)
-class BookInstanceAdmin(admin.ModelAdmin):
+class BookInstanceAdmin(ReplicaModelAdmin):
+    form = BookInstanceAdminForm
     list_display = ('book', 'status', 'borrower', 'due_back', 'id')
     list_filter = ('status', 'due_back')
+    ordering = ('due_back',)
+    # Livro (usado também em __str__) e solicitante na mesma consulta
+    list_select_related = ('book', 'borrower')
+    autocomplete_fields = ['book', 'borrower']
+    # Tabela grande: total estimado e sem o COUNT(*) extra da tabela toda
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['renew_selected', 'return_selected']
     fieldsets = (
         (None, {
             'fields': ('book', 'imprint', 'id')
         }),
         ('Disponibilidade', {
-            'fields': ('status', 'due_back', 'borrower')
+            'fields': ('status', 'due_back', 'borrower',
+                       *BookInstanceAdminForm.ORIGINAL_FIELDS)
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # Grava só os campos alterados e apenas se a situação e o solicitante
+        #  da cópia não mudaram desde que o formulário foi aberto (a conferência
+        #  de clean() repetida na troca condicional, ver catalog/circulation.py)
+        fields = [name for name in form.changed_data if name not in form.ORIGINAL_FIELDS]
+        obj._circulation_result = circulation.save_copy(
+            obj, fields, form.cleaned_data['original_status'],
+            borrower_id=form.cleaned_data['original_borrower'])
+
+    def response_change(self, request, obj):
+        result = getattr(obj, '_circulation_result', None)
+        if result is not None and not result:
+            self.message_user(request, f'{obj}: {result.label}; nada foi gravado.',
+                              messages.ERROR)
+            return HttpResponseRedirect(request.path)
+        return super().response_change(request, obj)
+
+    def _report(self, request, result):
+        if result.done:
+            self.message_user(request, f'{len(result.done)} cópia(s) atualizada(s).',
+                              messages.SUCCESS)
+        for pk, outcome in result.failed.items():
+            self.message_user(request, f'{pk}: {circulation.OUTCOME_LABELS[outcome]}',
+                              messages.WARNING)
+
+    @admin.action(description='Renovar empréstimos selecionados (3 semanas)',
+                  permissions=['mark_returned'])
+    def renew_selected(self, request, queryset):
+        self._report(request, circulation.renew(circulation.default_renewal_date(),
+                                                ids=queryset.values_list('pk', flat=True)))
+
+    @admin.action(description='Devolver cópias selecionadas', permissions=['mark_returned'])
+    def return_selected(self, request, queryset):
+        self._report(request, circulation.check_in(ids=queryset.values_list('pk', flat=True)))
 
+    def has_mark_returned_permission(self, request):
+        return request.user.has_perm('catalog.can_mark_returned')
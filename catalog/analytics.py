@@ -0,0 +1,261 @@
+"""Estatísticas de circulação: registro de eventos e totais diários.
+
+Cada mudança de situação, solicitante ou devolução prevista de uma cópia
+gera um CirculationEvent (somente inclusão): em save() (sinal em
+catalog/signals.py) e nas trocas condicionais e operações em lote de
+catalog/circulation.py.  Cópias criadas em massa (importação,
+seed_library) não geram eventos: não são empréstimos.
+
+O comando 'aggregate_circulation' soma apenas os eventos novos (id acima
+do checkpoint) em CirculationDaily, por dia e dimensão.  report() lê só os
+totais diários do intervalo pedido: o custo do relatório depende do
+intervalo, não do tamanho do histórico.
+"""
+import datetime
+import uuid
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import (AggregationCheckpoint, Book, BookInstance, CirculationDaily,
+                     CirculationEvent, Genre, Language)
+
+CHECKPOINT = 'circulation_daily'
+BATCH_SIZE = 1000
+# Eventos mais novos que isso podem estar em transações ainda abertas (um id
+#  menor confirmado depois de um maior): o lote para no primeiro deles, e
+#  ele e os seguintes ficam p/ a próxima agregação
+SETTLE = datetime.timedelta(seconds=5)
+
+# Colunas da cópia acompanhadas pelo registro
+TRACKED = ('status', 'borrower_id', 'due_back')
+MEASURES = ('loans', 'returns', 'renewals', 'loan_days')
+
+
+def event_kind(old, new):
+    """Tipo do evento da mudança 'old' -> 'new' (dicionários com as colunas
+       de TRACKED), ou None se nenhuma delas mudou."""
+    if all(old.get(name) == new.get(name) for name in TRACKED):
+        return None
+    was_loaned, is_loaned = old.get('status') == 'e', new.get('status') == 'e'
+    if is_loaned and (not was_loaned or old.get('borrower_id') != new.get('borrower_id')):
+        return CirculationEvent.LOAN
+    if was_loaned and not is_loaned:
+        return CirculationEvent.RETURN
+    if is_loaned:
+        return CirculationEvent.RENEWAL
+    if new.get('status') == 'r' and old.get('status') != 'r':
+        return CirculationEvent.RESERVE
+    return CirculationEvent.CHANGE
+
+
+def build(copy_id, book_id, old, new, occurred_at=None):
+    """CirculationEvent (não gravado) da mudança, ou None."""
+    kind = event_kind(old, new)
+    if kind is None:
+        return None
+    borrower = old if kind == CirculationEvent.RETURN else new
+    return CirculationEvent(
+        occurred_at=occurred_at or timezone.now(), kind=kind, copy_id=copy_id,
+        book_id=book_id, borrower_id=borrower.get('borrower_id'),
+        status_from=old.get('status') or '', status_to=new.get('status') or '',
+        due_back=new.get('due_back'),
+    )
+
+
+def record(events):
+    """Grava os eventos (ignora None) num único INSERT."""
+    events = [event for event in events if event is not None]
+    if events:
+        CirculationEvent.objects.bulk_create(events)
+    return events
+
+
+def _measures(event, day):
+    if event['kind'] == CirculationEvent.LOAN:
+        return {'loans': 1}
+    if event['kind'] == CirculationEvent.RENEWAL:
+        return {'renewals': 1}
+    if event['kind'] == CirculationEvent.RETURN:
+        # Empréstimo anterior ao registro de eventos: duração desconhecida;
+        #  devolvido no mesmo dia conta um dia
+        started = event['loan_started']
+        days = max((day - timezone.localdate(started)).days, 1) if started else 0
+        return {'returns': 1, 'loan_days': days}
+    return {}
+
+
+def _dimensions(events):
+    """Função evento -> [(dimensão, chave)], com gêneros e idiomas dos livros
+       do lote lidos em duas consultas."""
+    book_ids = {event['book_id'] for event in events if event['book_id']}
+    languages = dict(Book.objects.filter(pk__in=book_ids).values_list('pk', 'language_id'))
+    genres = defaultdict(list)
+    for book_id, genre_id in (Book.genre.through.objects.filter(book_id__in=book_ids)
+                              .values_list('book_id', 'genre_id')):
+        genres[book_id].append(genre_id)
+
+    def keys(event):
+        found = [(CirculationDaily.ALL, ''), (CirculationDaily.COPY, str(event['copy_id']))]
+        found += [(CirculationDaily.GENRE, str(pk)) for pk in genres[event['book_id']]]
+        if languages.get(event['book_id']):
+            found.append((CirculationDaily.LANGUAGE, str(languages[event['book_id']])))
+        if event['kind'] == CirculationEvent.LOAN and event['borrower_id']:
+            found.append((CirculationDaily.BORROWER, str(event['borrower_id'])))
+        return found
+    return keys
+
+
+def _add(totals):
+    """Soma 'totals' {(dimensão, dia, chave): medidas} às linhas diárias."""
+    existing = {
+        (row.dimension, row.day, row.key): row
+        for row in CirculationDaily.objects.filter(
+            day__in={day for _, day, _ in totals}, key__in={key for _, _, key in totals})
+    }
+    changed, new = [], []
+    for (dimension, day, key), measures in totals.items():
+        row = existing.get((dimension, day, key))
+        if row is None:
+            new.append(CirculationDaily(dimension=dimension, day=day, key=key, **measures))
+            continue
+        for name, value in measures.items():
+            setattr(row, name, getattr(row, name) + value)
+        changed.append(row)
+    CirculationDaily.objects.bulk_create(new)
+    CirculationDaily.objects.bulk_update(changed, MEASURES)
+
+
+def fold(batch_size=BATCH_SIZE, settle=SETTLE):
+    """Soma o próximo lote de eventos novos aos totais diários.
+
+       O lote é uma faixa contínua de ids: termina antes do primeiro evento
+       ainda recente (ver SETTLE), mesmo que haja ids maiores mais antigos,
+       p/ que o checkpoint nunca passe de um id que pode ainda aparecer.
+       O checkpoint travado serializa agregações concorrentes (a segunda
+       espera a primeira terminar); totais e checkpoint são gravados na
+       mesma transação.  Retorna o nº de eventos."""
+    with transaction.atomic():
+        # Trava o checkpoint com uma escrita antes de qualquer leitura: no
+        #  SQLite a transação que começa lendo não espera pela outra (falha
+        #  com 'database is locked'); a que começa escrevendo espera
+        #  (busy_timeout, ver catalog/sqlite.py)
+        if not AggregationCheckpoint.objects.filter(name=CHECKPOINT).update(last_id=F('last_id')):
+            AggregationCheckpoint.objects.get_or_create(name=CHECKPOINT)
+        checkpoint = AggregationCheckpoint.objects.select_for_update().get(name=CHECKPOINT)
+        loan_started = (CirculationEvent.objects
+                        .filter(copy_id=OuterRef('copy_id'), kind=CirculationEvent.LOAN,
+                                id__lt=OuterRef('id'))
+                        .order_by('-id').values('occurred_at')[:1])
+        events = list(
+            CirculationEvent.objects
+            .filter(id__gt=checkpoint.last_id)
+            .order_by('id')
+            .annotate(loan_started=Subquery(loan_started))
+            .values('id', 'occurred_at', 'kind', 'copy_id', 'book_id', 'borrower_id',
+                    'loan_started')[:batch_size]
+        )
+        settled = timezone.now() - settle
+        for position, event in enumerate(events):
+            if event['occurred_at'] >= settled:
+                events = events[:position]
+                break
+        if not events:
+            return 0
+
+        keys = _dimensions(events)
+        totals = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+        for event in events:
+            day = timezone.localdate(event['occurred_at'])
+            measures = _measures(event, day)
+            if not measures:
+                continue
+            for dimension, key in keys(event):
+                for name, value in measures.items():
+                    totals[(dimension, day, key)][name] += value
+        _add(totals)
+
+        checkpoint.last_id = events[-1]['id']
+        checkpoint.save()
+    return len(events)
+
+
+def aggregate(batch_size=BATCH_SIZE, settle=SETTLE):
+    """Soma todos os eventos novos, lote a lote; retorna o nº de eventos."""
+    total = 0
+    while True:
+        count = fold(batch_size, settle)
+        total += count
+        if count < batch_size:
+            return total
+
+
+def rebuild(batch_size=BATCH_SIZE, settle=SETTLE):
+    """Recalcula os totais diários do zero a partir de todo o registro."""
+    with transaction.atomic():
+        CirculationDaily.objects.all().delete()
+        AggregationCheckpoint.objects.filter(name=CHECKPOINT).delete()
+    return aggregate(batch_size, settle)
+
+
+def _pivot(rows, months, names):
+    """[(nome, [empréstimos por mês], total)] ordenado pelo total."""
+    table = defaultdict(lambda: dict.fromkeys(months, 0))
+    for row in rows:
+        table[row['key']][row['month']] += row['loans']
+    result = [(names.get(key, key), [values[month] for month in months], sum(values.values()))
+              for key, values in table.items()]
+    return sorted(result, key=lambda item: (-item[2], str(item[0])))
+
+
+def report(start, end, top=10):
+    """Relatório de circulação entre 'start' e 'end' (inclusive), lido
+       apenas dos totais diários."""
+    rows = CirculationDaily.objects.filter(day__range=(start, end))
+
+    monthly = list(
+        rows.filter(dimension=CirculationDaily.ALL)
+        .annotate(month=TruncMonth('day')).values('month')
+        .annotate(loans=Sum('loans'), returns=Sum('returns'), renewals=Sum('renewals'))
+        .order_by('month')
+    )
+    months = [row['month'] for row in monthly]
+
+    def by_month(dimension):
+        return (rows.filter(dimension=dimension).annotate(month=TruncMonth('day'))
+                .values('key', 'month').annotate(loans=Sum('loans')).order_by())
+
+    def ranking(dimension, measure):
+        return list(rows.filter(dimension=dimension).values('key')
+                    .annotate(total=Sum(measure)).filter(total__gt=0)
+                    .order_by('-total', 'key')[:top])
+
+    genre_rows = list(by_month(CirculationDaily.GENRE))
+    language_rows = list(by_month(CirculationDaily.LANGUAGE))
+    borrowers = ranking(CirculationDaily.BORROWER, 'loans')
+    copies = ranking(CirculationDaily.COPY, 'loan_days')
+
+    # Nomes apenas das linhas exibidas
+    genres = {str(pk): name for pk, name in Genre.objects.filter(
+        pk__in={row['key'] for row in genre_rows}).values_list('pk', 'name')}
+    languages = {str(pk): name for pk, name in Language.objects.filter(
+        pk__in={row['key'] for row in language_rows}).values_list('pk', 'name')}
+    users = User.objects.in_bulk([int(row['key']) for row in borrowers])
+    copy_objects = BookInstance.objects.select_related('book').in_bulk(
+        [uuid.UUID(row['key']) for row in copies])
+
+    period = (end - start).days + 1
+    return {
+        'months': months,
+        'monthly': monthly,
+        'genres': _pivot(genre_rows, months, genres),
+        'languages': _pivot(language_rows, months, languages),
+        'borrowers': [(users.get(int(row['key'])), row['key'], row['total'])
+                      for row in borrowers],
+        'copies': [(copy_objects.get(uuid.UUID(row['key'])), row['key'], row['total'],
+                    100 * row['total'] / period) for row in copies],
+    }
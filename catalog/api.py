@@ -0,0 +1,193 @@
+"""API JSON somente leitura do catálogo (quiosques e aplicativos).
+
+Cada recurso lê apenas as colunas pedidas em ?fields=... com
+QuerySet.values() e serializa as linhas direto, sem instanciar modelos.
+Listagens usam paginação por cursor (KeysetPaginator pelo id); ?ids=...
+(ou ?isbns=... em livros) busca vários registros numa única consulta.
+
+    GET /catalog/api/books/?fields=title,isbn&limit=20
+    GET /catalog/api/books/?cursor=<next do resultado anterior>
+    GET /catalog/api/books/?isbns=9788535910667,9788520923252
+    GET /catalog/api/copies/?book=42&status=d
+"""
+import uuid
+
+from . import lookups
+from .models import Author, Book, BookInstance, Genre, Language
+from .pagination import KeysetPaginator
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+# Máximo de ids/ISBNs numa busca em lote
+MAX_BATCH = 100
+
+
+class ApiError(ValueError):
+    pass
+
+
+def _int(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f'Número inválido: {value}')
+
+
+def _uuid(value):
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise ApiError(f'Identificador inválido: {value}')
+
+
+def _status(value):
+    if value not in {code for code, _ in BookInstance.LOAN_STATUS}:
+        raise ApiError(f'Situação inválida: {value}')
+    return value
+
+
+class Resource:
+    """Recurso da API: campos públicos -> caminho no ORM (ou expressão).
+
+       'extras' são campos calculados a partir de uma consulta à parte por
+       página (ex.: gêneros de cada livro), nunca um N+1."""
+
+    def __init__(self, model, fields, default, filters=None, parse_id=_int,
+                 batch=None, extras=None):
+        self.model = model
+        self.fields = fields
+        self.default = default
+        self.filters = filters or {}
+        self.parse_id = parse_id
+        self.batch = batch or {'ids': ('pk', parse_id)}
+        self.extras = extras or {}
+
+    def queryset(self, names, params, extra=()):
+        queryset = self.model.objects.all()
+        for param, (lookup, parse) in self.filters.items():
+            if params.get(param):
+                queryset = queryset.filter(**{lookup: parse(params[param])})
+
+        plain, expressions = list(dict.fromkeys(['id', *extra])), {}
+        for name in names:
+            if name in self.extras or name == 'id':
+                continue
+            path = self.fields[name]
+            if isinstance(path, str):
+                if path not in plain:
+                    plain.append(path)
+            else:
+                expressions[f'api_{name}'] = path
+        return queryset.values(*plain, **expressions)
+
+    def serialize(self, names, rows):
+        """Linhas de values() -> dicionários com os nomes públicos."""
+        keys = [(name, self.fields[name] if isinstance(self.fields[name], str)
+                 else f'api_{name}') for name in names if name not in self.extras]
+        results = [{name: row[key] for name, key in keys} for row in rows]
+        for name in names:
+            if name in self.extras:
+                values = self.extras[name]([row['id'] for row in rows])
+                for row, result in zip(rows, results):
+                    result[name] = values.get(row['id'], [])
+        return results
+
+
+def _book_genres(book_ids):
+    # Apenas a tabela de ligação; nomes da memória (catalog/lookups.py)
+    names = lookups.table(Genre)
+    genres = {}
+    for book_id, genre_id in (Book.genre.through.objects.filter(book_id__in=book_ids)
+                              .values_list('book_id', 'genre_id')):
+        if genre_id in names:
+            genres.setdefault(book_id, []).append(names[genre_id].name)
+    return {book_id: sorted(values) for book_id, values in genres.items()}
+
+
+RESOURCES = {
+    'books': Resource(
+        Book,
+        fields={
+            'id': 'id', 'title': 'title', 'isbn': 'isbn', 'summary': 'summary',
+            'author': 'author_id', 'language': 'language__name', 'genres': None,
+            'copies': 'copies_total', 'available': 'copies_available',
+            'on_loan': 'copies_on_loan',
+            'updated_at': 'updated_at',
+        },
+        default=('id', 'title', 'isbn', 'author'),
+        filters={'author': ('author_id', _int), 'language': ('language__name', str)},
+        batch={'ids': ('pk', _int), 'isbns': ('isbn', str)},
+        extras={'genres': _book_genres},
+    ),
+    'authors': Resource(
+        Author,
+        fields={
+            'id': 'id', 'first_name': 'first_name', 'last_name': 'last_name',
+            'date_of_birth': 'date_of_birth', 'date_of_death': 'date_of_death',
+            'updated_at': 'updated_at',
+        },
+        default=('id', 'first_name', 'last_name'),
+    ),
+    # Disponibilidade das cópias (sem dados do solicitante)
+    'copies': Resource(
+        BookInstance,
+        fields={
+            'id': 'id', 'book': 'book_id', 'imprint': 'imprint', 'status': 'status',
+            'due_back': 'due_back', 'updated_at': 'updated_at',
+        },
+        default=('id', 'book', 'status', 'due_back'),
+        filters={'book': ('book_id', _int), 'status': ('status', _status)},
+        parse_id=_uuid,
+    ),
+    'genres': Resource(Genre, fields={'id': 'id', 'name': 'name'}, default=('id', 'name')),
+    'languages': Resource(Language, fields={'id': 'id', 'name': 'name'}, default=('id', 'name')),
+}
+
+
+def _fields(resource, params):
+    if not params.get('fields'):
+        return list(resource.default)
+    names = [name.strip() for name in params['fields'].split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise ApiError(f'Campos desconhecidos: {", ".join(unknown)}')
+    # 'id' sempre presente: chave do cursor e dos lotes
+    return ['id'] + [name for name in dict.fromkeys(names) if name != 'id']
+
+
+def _limit(params):
+    limit = _int(params.get('limit') or DEFAULT_LIMIT)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f'limit deve estar entre 1 e {MAX_LIMIT}')
+    return limit
+
+
+def query(name, params):
+    """Resposta (dicionário) p/ o recurso 'name' com os parâmetros da URL."""
+    resource = RESOURCES.get(name)
+    if resource is None:
+        raise LookupError(name)
+    names = _fields(resource, params)
+
+    for param, (lookup, parse) in resource.batch.items():
+        if param not in params:
+            continue
+        keys = [parse(value.strip()) for value in params[param].split(',') if value.strip()]
+        if not keys or len(keys) > MAX_BATCH:
+            raise ApiError(f'{param}: informe de 1 a {MAX_BATCH} valores')
+        field = 'id' if lookup == 'pk' else lookup
+        rows = list(resource.queryset(names, params, extra=[field])
+                    .filter(**{f'{lookup}__in': keys}).order_by('id'))
+        found = {row[field] for row in rows}
+        return {
+            'results': resource.serialize(names, rows),
+            'missing': [key for key in keys if key not in found],
+        }
+
+    queryset = resource.queryset(names, params)
+    paginator = KeysetPaginator(queryset, _limit(params), ('id',), with_count=False)
+    page = paginator.get_page(params.get('cursor'))
+    return {
+        'results': resource.serialize(names, page.object_list),
+        'next': page.next_cursor,
+    }
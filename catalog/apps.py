@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'catalog'
+
+    def ready(self):
+        # Registra os receptores de sinais do catálogo e os PRAGMAs do SQLite
+        from . import signals, sqlite  # noqa: F401
@@ -0,0 +1,63 @@
+"""Bibliotecas de terceiros servidas pelo próprio site, sem CDN.
+
+Cada entrada de VENDORED diz onde o arquivo fica em catalog/static/ e de
+onde veio, com o hash SRI (integrity) da versão fixada.  O comando
+'vendor_assets' baixa os arquivos que faltam e confere o hash; depois disso
+o collectstatic os trata como qualquer outro estático (nome com hash,
+versões .gz/.br, ver catalog/staticfiles.py).
+
+Enquanto um arquivo não estiver em catalog/static/, as páginas continuam
+usando a CDN de origem (ver catalog/templatetags/catalog_assets.py).
+"""
+import base64
+import functools
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.contrib.staticfiles import finders
+
+STATIC_DIR = Path(__file__).resolve().parent / 'static'
+
+
+@dataclass(frozen=True)
+class Asset:
+    path: str
+    url: str
+    integrity: str
+
+
+VENDORED = {
+    'bootstrap.css': Asset(
+        path='vendor/bootstrap/5.3.3/bootstrap.min.css',
+        url='https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+        integrity='sha384-QWTKZyjpPEjISv5WaRU9OFeRpok6YctnYmDr5pNlyT2bRjXh0JMhjY6hW+ALEwIH',
+    ),
+}
+
+
+def integrity(content, algorithm='sha384'):
+    """Hash SRI ('sha384-...') de um conteúdo."""
+    digest = hashlib.new(algorithm, content).digest()
+    return f'{algorithm}-{base64.b64encode(digest).decode()}'
+
+
+@functools.lru_cache(maxsize=None)
+def is_vendored(name):
+    """O arquivo de 'name' já está entre os estáticos do site?"""
+    return finders.find(VENDORED[name].path) is not None
+
+
+def save(name, content):
+    """Grava o conteúdo baixado de 'name' em catalog/static/, se o hash
+       conferir com o fixado; retorna o caminho."""
+    asset = VENDORED[name]
+    algorithm = asset.integrity.split('-', 1)[0]
+    if integrity(content, algorithm) != asset.integrity:
+        raise ValueError(f'{asset.url}: conteúdo não confere com {asset.integrity}')
+
+    target = STATIC_DIR / asset.path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(content)
+    is_vendored.cache_clear()
+    return target
@@ -0,0 +1,14 @@
+from django.urls import path
+from . import async_views
+
+# Rotas com versão assíncrona (ASGI).  Incluídas antes de catalog.urls em
+#  locallibrary/asgi_urls.py; as demais rotas continuam síncronas
+urlpatterns = [
+    path('', async_views.index, name='index'),
+    path('books/', async_views.book_list, name='books'),
+    path('book/<int:pk>', async_views.book_detail, name='book-detail'),
+    path('authors/', async_views.author_list, name='authors'),
+    path('author/<int:pk>', async_views.author_detail, name='author-detail'),
+    path('mybooks/', async_views.my_borrowed, name='my-borrowed'),
+    path('borrowed/', async_views.all_borrowed_books, name='borrowed-books'),
+]
@@ -0,0 +1,160 @@
+"""Versões assíncronas das páginas públicas e de empréstimos do catálogo.
+
+Servidas apenas pelo ASGI (locallibrary/asgi.py usa locallibrary.asgi_urls):
+no WSGI continuam as views de catalog/views.py.  Os dados são lidos com o
+ORM assíncrono (aget, acount, async for) e só depois o modelo HTML é
+renderizado com sync_to_async, pois o menu lateral consulta o usuário da
+sessão (ORM síncrono).  Os modelos e o contexto são os mesmos das views
+síncronas.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.db.models import Prefetch
+from django.http import Http404
+from django.shortcuts import render
+
+from catalog import (circulation, conditional, counters, directory, lookups, object_cache, routers,
+                     views, visits)
+from catalog.forms import BulkLoanForm
+from catalog.models import Author, Book, BookInstance
+from catalog.pagination import apaginate
+
+
+async def _render(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+def _load_user(request):
+    # Força a leitura da sessão; depois disso request.user não consulta a base
+    request.user.is_authenticated
+    return request.user
+
+
+def _list_context(name, page_obj):
+    """Mesmo contexto de ListView (e de paginate()) p/ os modelos."""
+    return {
+        name: page_obj.object_list,
+        'object_list': page_obj.object_list,
+        'page_obj': page_obj,
+        'paginator': page_obj.paginator,
+        'is_paginated': page_obj.has_other_pages(),
+    }
+
+
+@routers.replica_reads
+async def index(request):
+    """Tela inicial: mesmos dados de views.index.
+
+       Os totais vêm dos contadores materializados numa única consulta,
+       então não há contagens a disparar em paralelo."""
+    counts = await counters.aget_counts()
+    num_visits = visits.visitor_count(request) + 1
+    await visits.site_visits.ahit()
+
+    context = {
+        'num_books': counts[counters.BOOKS],
+        'num_instances': counts[counters.INSTANCES],
+        'num_instances_available': counts[counters.INSTANCES_AVAILABLE],
+        'num_authors': counts[counters.AUTHORS],
+        'num_visits': num_visits,
+        'num_site_visits': visits.total(counts.get(counters.SITE_VISITS, 0)),
+    }
+    response = await _render(request, 'index.html', context)
+    visits.set_visitor_count(response, num_visits)
+    return response
+
+
+@routers.replica_reads
+@conditional.page(conditional.book_list)
+async def book_list(request):
+    books, ordering, options = views.book_list_query(request.GET)
+    page_obj = await apaginate(request, books, 10, ordering)
+    return await _render(request, 'catalog/book_list.html',
+                         _list_context('book_list', page_obj) | options)
+
+
+@conditional.page(conditional.book_detail)
+async def book_detail(request, pk):
+    async def build():
+        books = (
+            Book.objects.select_related('author')
+            .prefetch_related(
+                Prefetch('bookinstance_set',
+                         queryset=BookInstance.objects.order_by('due_back', 'id')),
+            )
+        )
+        try:
+            book = await books.aget(pk=pk)
+        except Book.DoesNotExist:
+            raise Http404('Livro não encontrado')
+        await sync_to_async(lookups.attach)([book])
+        return book
+
+    book = await object_cache.aget_or_build('book', pk, build)
+    return await _render(request, 'catalog/book_detail.html',
+                         {'book': book, 'object': book})
+
+
+@routers.replica_reads
+@conditional.page(conditional.author_list)
+async def author_list(request):
+    letters = await directory.aletters()
+    authors = Author.objects.order_by(*directory.ORDERING)
+    page_obj = await apaginate(request, authors, views.AuthorListView.paginate_by,
+                               directory.ORDERING, keyset_only=True,
+                               count=sum(count for _, count, _ in letters))
+    return await _render(request, 'catalog/author_list.html',
+                         _list_context('author_list', page_obj) | {'letters': letters})
+
+
+@conditional.page(conditional.author_detail)
+async def author_detail(request, pk):
+    async def build():
+        books = Book.objects.order_by('title')
+        authors = Author.objects.prefetch_related(Prefetch('book_set', queryset=books))
+        try:
+            return await authors.aget(pk=pk)
+        except Author.DoesNotExist:
+            raise Http404('Autor não encontrado')
+
+    author = await object_cache.aget_or_build('author', pk, build)
+    return await _render(request, 'catalog/author_detail.html',
+                         {'author': author, 'object': author})
+
+
+async def my_borrowed(request):
+    user = await sync_to_async(_load_user)(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+
+    loans = (
+        BookInstance.objects.on_loan()
+        .filter(borrower=user)
+        .select_related('book')
+        .order_by('due_back', 'id')
+    )
+    page_obj = await apaginate(request, loans, 10, ('due_back', 'id'))
+    return await _render(request, 'catalog/bookinstance_list_borrowed_user.html',
+                         _list_context('bookinstance_list', page_obj))
+
+
+@routers.replica_reads
+async def all_borrowed_books(request):
+    # Operações em lote (POST) continuam na view síncrona
+    if request.method == 'POST':
+        return await sync_to_async(views.all_borrowed_books)(request)
+
+    user = await sync_to_async(_load_user)(request)
+    if not await sync_to_async(user.has_perm)('catalog.can_mark_returned'):
+        return redirect_to_login(request.get_full_path())
+
+    loans = (
+        BookInstance.objects.on_loan()
+        .select_related('book', 'borrower')
+        .order_by('due_back', 'id')
+    )
+    page_obj = await apaginate(request, loans, 10, ('due_back', 'id'))
+    context = _list_context('bookinstance_list', page_obj)
+    context['bulk_form'] = BulkLoanForm(initial={
+        'renewal_date': circulation.default_renewal_date()})
+    return await _render(request, 'catalog/all_borrowed_books.html', context)
@@ -0,0 +1,112 @@
+"""Disponibilidade de cada livro: contadores de cópias em Book.
+
+copies_total, copies_available ('d') e copies_on_loan ('e') são mantidos
+de forma incremental (F() + delta, no mesmo UPDATE que atualiza
+'updated_at' do livro) pelos sinais de BookInstance e pelas operações de
+catalog/circulation.py.  Listagens e páginas de detalhe mostram a
+disponibilidade sem contar cópias.  O comando 'check_availability' compara
+os contadores com as cópias e corrige diferenças.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import object_cache
+from .models import Book, BookInstance
+
+TOTAL = 'copies_total'
+# Coluna de cada situação contada
+STATUS_COLUMNS = {'d': 'copies_available', 'e': 'copies_on_loan'}
+COLUMNS = (TOTAL, *STATUS_COLUMNS.values())
+
+
+def deltas(changes):
+    """{livro: Counter(coluna: delta)} p/ uma lista de mudanças de cópias
+       (livro antes, situação antes, livro depois, situação depois); None
+       no 'antes' é uma cópia nova e no 'depois', uma cópia removida."""
+    result = defaultdict(Counter)
+    for old_book, old_status, new_book, new_status in changes:
+        if old_book is not None:
+            if old_book != new_book:
+                result[old_book][TOTAL] -= 1
+            if old_status in STATUS_COLUMNS and (old_book, old_status) != (new_book, new_status):
+                result[old_book][STATUS_COLUMNS[old_status]] -= 1
+        if new_book is not None:
+            if old_book != new_book:
+                result[new_book][TOTAL] += 1
+            if new_status in STATUS_COLUMNS and (old_book, old_status) != (new_book, new_status):
+                result[new_book][STATUS_COLUMNS[new_status]] += 1
+    return result
+
+
+def apply(book_deltas):
+    """Soma os deltas aos contadores de todos os livros num único UPDATE."""
+    book_deltas = {book_id: counts for book_id, counts in book_deltas.items()
+                   if book_id is not None and any(counts.values())}
+    if not book_deltas:
+        return
+
+    changes = {}
+    for column in COLUMNS:
+        whens = [When(pk=book_id, then=Value(counts[column]))
+                 for book_id, counts in book_deltas.items() if counts[column]]
+        if whens:
+            changes[column] = F(column) + Case(*whens, default=Value(0),
+                                               output_field=IntegerField())
+    # Disponibilidade aparece na listagem: muda a ETag (ver catalog/conditional.py)
+    Book.objects.filter(pk__in=book_deltas).update(updated_at=timezone.now(), **changes)
+
+
+def moved(changes):
+    """deltas() + apply()."""
+    apply(deltas(changes))
+
+
+def copies_changed(book_ids):
+    """Cópias (e a disponibilidade) aparecem na página do livro e nos totais
+       da página do autor: invalida os dois no cache de objetos."""
+    book_ids = {pk for pk in book_ids if pk is not None}
+    if book_ids:
+        object_cache.invalidate('book', book_ids)
+        object_cache.invalidate('author', Book.objects.filter(pk__in=book_ids)
+                                .values_list('author_id', flat=True))
+
+
+def actual():
+    """Subconsultas com os valores corretos, a partir das cópias."""
+    def count(**filters):
+        copies = (BookInstance.objects.filter(book=OuterRef('pk'), **filters)
+                  .order_by().values('book').annotate(n=Count('pk')).values('n'))
+        return Coalesce(Subquery(copies), 0)
+
+    return {
+        TOTAL: count(),
+        **{column: count(status=status) for status, column in STATUS_COLUMNS.items()},
+    }
+
+
+def refresh(book_ids=None):
+    """Recalcula os contadores dos livros indicados (todos por padrão)."""
+    books = Book.objects.all() if book_ids is None else Book.objects.filter(pk__in=book_ids)
+    return books.update(updated_at=timezone.now(), **actual())
+
+
+def drift(book_ids=None):
+    """Livros cujos contadores diferem das cópias:
+       [(id, {coluna: (gravado, correto)})]."""
+    books = Book.objects.all() if book_ids is None else Book.objects.filter(pk__in=book_ids)
+    correct = {f'actual_{column}': expression for column, expression in actual().items()}
+    mismatch = Q()
+    for column in COLUMNS:
+        mismatch |= ~Q(**{column: F(f'actual_{column}')})
+
+    found = []
+    for row in (books.annotate(**correct).filter(mismatch)
+                .values('pk', *COLUMNS, *correct).order_by('pk')):
+        found.append((row['pk'], {
+            column: (row[column], row[f'actual_{column}'])
+            for column in COLUMNS if row[column] != row[f'actual_{column}']
+        }))
+    return found
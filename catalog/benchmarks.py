@@ -0,0 +1,253 @@
+"""Funções de apoio aos comandos de benchmark do catálogo."""
+import asyncio
+import contextlib
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import Permission, User
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import visits
+from .models import Author, Book, BookInstance, CatalogCounter
+
+BENCH_LIBRARIAN = 'bench_bibliotecario'
+
+
+def percentiles(samples):
+    """p50/p95/p99, média e máximo (em milissegundos) de tempos em segundos."""
+    samples = sorted(samples)
+    if len(samples) == 1:
+        cuts = samples * 99
+    else:
+        cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'p50': cuts[49] * 1000,
+        'p95': cuts[94] * 1000,
+        'p99': cuts[98] * 1000,
+        'mean': statistics.fmean(samples) * 1000,
+        'max': samples[-1] * 1000,
+    }
+
+
+def bench_librarian():
+    """Usuário com permissão de bibliotecário usado pelos benchmarks."""
+    user, created = User.objects.get_or_create(username=BENCH_LIBRARIAN)
+    if created:
+        user.set_unusable_password()
+        user.save()
+        user.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+    return user
+
+
+@contextlib.contextmanager
+def throwaway_database():
+    """Troca a base 'default' por uma cópia temporária durante o bloco (API
+       de backup do SQLite, como no comando bench_database): o que as
+       requisições gravam some com a cópia.  Só p/ uma base SQLite em arquivo
+       fora de uma transação; nos demais casos não troca nada.  Retorna se
+       trocou."""
+    if (connection.vendor != 'sqlite' or connection.is_in_memory_db()
+            or connection.in_atomic_block):
+        yield False
+        return
+
+    settings_dict = connection.settings_dict
+    original = settings_dict['NAME']
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        connection.ensure_connection()
+        with sqlite3.connect(path) as target:
+            connection.connection.backup(target)
+        target.close()
+        # Conexões novas (também as das threads) passam a abrir a cópia
+        connection.close()
+        settings_dict['NAME'] = path
+        try:
+            yield True
+        finally:
+            connection.close()
+            settings_dict['NAME'] = original
+
+
+@contextlib.contextmanager
+def leave_no_trace():
+    """Desfaz o que os benchmarks deixariam na base: apaga o bibliotecário
+       (se criado durante a medição) e descarta as visitas contadas pelas
+       requisições, que não são visitas de verdade.  As sessões são apagadas
+       pelos próprios clientes (logout)."""
+    existed = User.objects.filter(username=BENCH_LIBRARIAN).exists()
+    try:
+        # Sem gravação periódica das visitas durante a medição
+        with override_settings(CATALOG_VISITS_FLUSH_INTERVAL=float('inf')):
+            yield
+    finally:
+        with visits.site_visits.lock:
+            visits.site_visits.pending = 0
+        if not existed:
+            User.objects.filter(username=BENCH_LIBRARIAN).delete()
+
+
+def catalog_targets():
+    """(nome, URL, usuário) de cada rota de catalog.urls, com objetos reais."""
+    book = Book.objects.order_by('pk').first()
+    author = Author.objects.order_by('pk').first()
+    loan = BookInstance.objects.on_loan().exclude(borrower=None).order_by('pk').first()
+    librarian = bench_librarian()
+
+    targets = [
+        ('index', reverse('index'), None),
+        ('books', reverse('books'), None),
+        ('authors', reverse('authors'), None),
+        ('borrowed-books', reverse('borrowed-books'), librarian),
+    ]
+    if book:
+        targets.append(('book-detail', reverse('book-detail', args=[book.pk]), None))
+    if author:
+        targets.append(('author-detail', reverse('author-detail', args=[author.pk]), None))
+    if loan:
+        targets.append(('my-borrowed', reverse('my-borrowed'), loan.borrower))
+        targets.append(('renew-book-librarian',
+                        reverse('renew-book-librarian', args=[loan.pk]), librarian))
+    return targets
+
+
+def rows_fetched(captured_queries):
+    """Total de linhas devolvidas pelos SELECTs capturados (re-executados
+       como COUNT(*), fora da medição de tempo)."""
+    total = 0
+    with connection.cursor() as cursor:
+        for query in captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            cursor.execute(f'SELECT COUNT(*) FROM ({sql})')
+            total += cursor.fetchone()[0]
+    return total
+
+
+def profile_request(client, url):
+    """Consultas e linhas lidas por uma requisição."""
+    with CaptureQueriesContext(connection) as ctx:
+        client.get(url)
+    return len(ctx.captured_queries), rows_fetched(ctx.captured_queries)
+
+
+def load_wsgi(url, user, requests, concurrency):
+    """'requests' GETs pelo WSGIHandler em 'concurrency' threads.
+
+       Retorna (tempos de cada requisição, tempo total), em segundos."""
+    def worker(count):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        samples = []
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                client.get(url)
+                samples.append(time.perf_counter() - started)
+        finally:
+            client.logout()
+            # Cada thread abre sua própria conexão com a base
+            connections.close_all()
+        return samples
+
+    shares = [requests // concurrency + (i < requests % concurrency)
+              for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(worker, shares))
+    return [sample for samples in results for sample in samples], time.perf_counter() - started
+
+
+def load_asgi(url, user, requests, concurrency):
+    """'requests' GETs pelo ASGIHandler, até 'concurrency' simultâneos num
+       único laço de eventos (como um servidor ASGI com um processo)."""
+    clients = [AsyncClient() for _ in range(concurrency)]
+    if user is not None:
+        for client in clients:
+            client.force_login(user)
+
+    async def worker(client, count, samples):
+        for _ in range(count):
+            started = time.perf_counter()
+            await client.get(url)
+            samples.append(time.perf_counter() - started)
+
+    async def run():
+        samples = []
+        await asyncio.gather(*(
+            worker(client, requests // concurrency + (i < requests % concurrency), samples)
+            for i, client in enumerate(clients)))
+        return samples
+
+    started = time.perf_counter()
+    try:
+        samples = asyncio.run(run())
+    finally:
+        for client in clients:
+            client.logout()
+    return samples, time.perf_counter() - started
+
+
+# Contador escrito pelo benchmark de leitura/escrita (apagado ao final)
+BENCH_WRITES = 'bench_writes'
+
+
+def mixed_load(readers, writers, duration, write_interval=0.01, using='default'):
+    """'readers' threads lendo a listagem de livros enquanto 'writers'
+       threads gravam (transações curtas, uma a cada 'write_interval'
+       segundos: a mesma carga de escrita nos dois perfis), durante
+       'duration' segundos, na base 'using'.
+
+       Retorna {'reads': tempos, 'writes': tempos, 'errors': n, 'elapsed': s}."""
+    deadline = time.perf_counter() + duration
+
+    writes = CatalogCounter.objects.using(using)
+    writes.get_or_create(name=BENCH_WRITES)
+
+    def read():
+        list(Book.objects.using(using).select_related('author').order_by('title', 'id')[:20])
+        BookInstance.objects.using(using).filter(status='d').count()
+
+    def write():
+        with transaction.atomic(using=using):
+            writes.filter(name=BENCH_WRITES).update(value=F('value') + 1)
+        time.sleep(write_interval)
+
+    def worker(operation):
+        samples, errors = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    operation()
+                except OperationalError:
+                    # 'database is locked' após esgotar o busy_timeout
+                    errors += 1
+                    continue
+                samples.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+        return operation, samples, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(readers + writers) as pool:
+        results = list(pool.map(worker, [read] * readers + [write] * writers))
+    elapsed = time.perf_counter() - started
+    writes.filter(name=BENCH_WRITES).delete()
+
+    return {
+        'reads': [s for operation, samples, _ in results if operation is read for s in samples],
+        'writes': [s for operation, samples, _ in results if operation is write for s in samples],
+        'errors': sum(errors for _, _, errors in results),
+        'elapsed': elapsed,
+    }
@@ -0,0 +1,258 @@
+"""Circulação: empréstimo, devolução, reserva e manutenção de cópias.
+
+Cada mudança de situação de uma cópia é uma troca condicional (compare and
+swap): UPDATE ... WHERE id = ? AND status = <situação esperada>, gravando
+apenas as colunas alteradas.  Se outra mesa de atendimento mudou a cópia
+antes, nenhuma linha é atualizada e o resultado é um conflito, nunca uma
+sobrescrita silenciosa.
+
+As operações em lote (renovação e devolução de várias cópias) travam as
+cópias escolhidas, decidem o resultado de cada uma e aplicam a mudança
+com um único UPDATE ... WHERE id IN (...) dentro de uma transação.
+
+No SQLite select_for_update() não trava nada e uma transação que começa
+lendo não espera pela trava de escrita (falha com 'database is locked'):
+as transações daqui começam com uma escrita sem efeito (status = status)
+nas cópias envolvidas, que espera as outras (busy_timeout) e trava as
+linhas nas demais bases.  As leituras seguintes veem o estado travado.
+
+update() não envia sinais, então contadores, disponibilidade dos livros
+(catalog/availability.py), cache de objetos, 'updated_at' e o registro de
+eventos de circulação (catalog/analytics.py) são atualizados aqui.
+"""
+import datetime
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from . import analytics, availability, counters
+from .models import BookInstance
+
+# Prazo máximo de uma renovação e prazo proposto por padrão
+RENEWAL_MAX = datetime.timedelta(weeks=4)
+RENEWAL_DEFAULT = datetime.timedelta(weeks=3)
+
+# Resultados por cópia
+OK = 'ok'
+CONFLICT = 'conflict'
+RENEWED = 'renewed'
+RETURNED = 'returned'
+NOT_FOUND = 'not_found'
+NOT_ON_LOAN = 'not_on_loan'
+
+OUTCOME_LABELS = {
+    OK: 'atualizada',
+    CONFLICT: 'alterada por outra pessoa',
+    RENEWED: 'renovada',
+    RETURNED: 'devolvida',
+    NOT_FOUND: 'não encontrada',
+    NOT_ON_LOAN: 'não está emprestada',
+}
+
+
+def validate_renewal_date(value, today=None):
+    """Regra de renovação: entre hoje e 4 semanas adiante."""
+    today = today or datetime.date.today()
+
+    # Data no passado?
+    if value < today:
+        raise ValidationError(_('Data inválida - renovação no passado'))
+
+    # Data dentro do intervalo de tempo permitido?
+    if value > today + RENEWAL_MAX:
+        raise ValidationError(_('Data inválida - renovação com mais de 4 semanas adiante'))
+
+
+def default_renewal_date():
+    return datetime.date.today() + RENEWAL_DEFAULT
+
+
+@dataclass(frozen=True)
+class Transition:
+    """Resultado da troca de situação de uma cópia.
+
+       'status' é a situação atual da cópia: a nova, se a troca foi feita,
+       ou a encontrada na base em caso de conflito."""
+    outcome: str
+    status: str = None
+
+    def __bool__(self):
+        return self.outcome == OK
+
+    @property
+    def label(self):
+        return OUTCOME_LABELS[self.outcome]
+
+
+def _availability_delta(old_status, new_status):
+    return int(new_status == 'd') - int(old_status == 'd')
+
+
+def _tracked(values):
+    """Colunas acompanhadas pelo registro de eventos, em 'values' (aceita
+       'borrower' como objeto ou 'borrower_id')."""
+    values = dict(values)
+    if 'borrower' in values:
+        borrower = values.pop('borrower')
+        values['borrower_id'] = borrower.pk if borrower is not None else None
+    return {name: values[name] for name in analytics.TRACKED if name in values}
+
+
+def _lock(queryset):
+    """Trava as cópias de 'queryset' com uma escrita sem efeito (ver a
+       descrição do módulo); retorna quantas foram travadas."""
+    return queryset.update(status=F('status'))
+
+
+def swap(pk, expected, changes, **conditions):
+    """Aplica 'changes' à cópia 'pk' somente se a situação ainda for
+       'expected' (e as demais 'conditions' valerem)."""
+    new_status = changes.get('status', expected)
+    guarded = BookInstance.objects.filter(pk=pk, status=expected, **conditions)
+    with transaction.atomic():
+        if not _lock(guarded):
+            current = BookInstance.objects.filter(pk=pk).values_list('status', flat=True).first()
+            return Transition(NOT_FOUND if current is None else CONFLICT, current)
+        # Valores anteriores p/ o registro de eventos (e o livro, p/ o
+        #  cache), lidos com a cópia já travada
+        before = (BookInstance.objects.filter(pk=pk)
+                  .values('book_id', 'borrower_id', 'due_back').get())
+        guarded.update(updated_at=timezone.now(), **changes)
+        counters.increment(counters.INSTANCES_AVAILABLE,
+                           _availability_delta(expected, new_status))
+        availability.moved([(before['book_id'], expected,
+                              changes.get('book_id', before['book_id']), new_status)])
+
+        old = _tracked(before) | {'status': expected}
+        new = old | _tracked(changes)
+        analytics.record([analytics.build(pk, changes.get('book_id', before['book_id']),
+                                          old, new)])
+    # Páginas do livro (dos dois, se a cópia trocou de livro) e do autor
+    availability.copies_changed([before['book_id'], changes.get('book_id')])
+    return Transition(OK, new_status)
+
+
+def checkout(pk, borrower, due_back=None):
+    """Empresta uma cópia disponível, ou reservada para o mesmo usuário."""
+    changes = {'status': 'e', 'borrower': borrower,
+               'due_back': due_back or default_renewal_date()}
+    result = swap(pk, 'd', changes)
+    if result.outcome == CONFLICT and result.status == 'r':
+        result = swap(pk, 'r', changes, borrower=borrower)
+    return result
+
+
+def return_copy(pk):
+    """Devolve uma cópia emprestada; volta a ficar disponível."""
+    return swap(pk, 'e', {'status': 'd', 'borrower': None, 'due_back': None})
+
+
+def reserve(pk, borrower):
+    """Reserva uma cópia disponível p/ 'borrower'."""
+    return swap(pk, 'd', {'status': 'r', 'borrower': borrower})
+
+
+def mark_maintenance(pk, expected='d'):
+    """Retira de circulação uma cópia (por padrão, uma disponível)."""
+    return swap(pk, expected, {'status': 'm', 'borrower': None, 'due_back': None})
+
+
+def save_copy(instance, fields, expected=None, **conditions):
+    """Grava apenas 'fields' de uma cópia editada (ex.: no admin), desde que
+       a situação na base seja 'expected' (por padrão, a de quando a cópia foi
+       lida) e as demais 'conditions' valham."""
+    if expected is None:
+        loaded = getattr(instance, '_loaded_values', None) or {}
+        expected = loaded.get('status', instance.status)
+    attnames = [instance._meta.get_field(name).attname for name in fields]
+    result = swap(instance.pk, expected,
+                  {attname: getattr(instance, attname) for attname in attnames}, **conditions)
+
+    # Cópia que trocou de livro: swap() já invalidou as páginas dos dois
+    if result:
+        instance.remember_loaded_values()
+    return result
+
+
+@dataclass
+class BulkResult:
+    """Resultado de uma operação em lote: {id da cópia: resultado}."""
+    outcomes: dict = field(default_factory=dict)
+
+    @property
+    def done(self):
+        return [pk for pk, outcome in self.outcomes.items() if outcome in (RENEWED, RETURNED)]
+
+    @property
+    def failed(self):
+        return {pk: outcome for pk, outcome in self.outcomes.items()
+                if outcome not in (RENEWED, RETURNED)}
+
+    def describe(self):
+        """(id, texto) de cada cópia, p/ mensagens e relatórios."""
+        return [(pk, OUTCOME_LABELS[outcome]) for pk, outcome in self.outcomes.items()]
+
+
+def _apply(ids, borrower, outcome, changes):
+    """Trava as cópias (por id ou todas emprestadas ao 'borrower'), marca as
+       que não estão emprestadas e atualiza as demais num único UPDATE."""
+    result = BulkResult()
+    with transaction.atomic():
+        queryset = BookInstance.objects.all()
+        if ids is not None:
+            ids = list(dict.fromkeys(ids))
+            queryset = queryset.filter(pk__in=ids)
+        else:
+            queryset = queryset.on_loan().filter(borrower=borrower)
+        _lock(queryset)
+        queryset = queryset.select_for_update()
+        rows = {row['pk']: row for row in
+                queryset.values('pk', 'status', 'book_id', 'borrower_id', 'due_back')}
+
+        for pk in ids if ids is not None else rows:
+            if pk not in rows:
+                result.outcomes[pk] = NOT_FOUND
+            elif rows[pk]['status'] != 'e':
+                result.outcomes[pk] = NOT_ON_LOAN
+            else:
+                result.outcomes[pk] = outcome
+
+        done = result.done
+        if done:
+            # Condição repetida no UPDATE: vale o estado travado acima
+            updated = BookInstance.objects.on_loan().filter(pk__in=done).update(
+                updated_at=timezone.now(), **changes)
+            if updated != len(done):
+                # Cópia alterada apesar da trava: nada de eventos nem
+                #  contadores de mudanças que não aconteceram
+                raise DatabaseError(f'{len(done) - updated} cópia(s) alterada(s) '
+                                    'durante a operação em lote')
+            analytics.record([
+                analytics.build(pk, rows[pk]['book_id'], _tracked(rows[pk]),
+                                _tracked(rows[pk]) | _tracked(changes))
+                for pk in done
+            ])
+            new_status = changes.get('status', 'e')
+            availability.moved([(rows[pk]['book_id'], 'e', rows[pk]['book_id'], new_status)
+                                for pk in done])
+            availability.copies_changed({rows[pk]['book_id'] for pk in done})
+    return result
+
+
+def renew(renewal_date, ids=None, borrower=None):
+    """Renova as cópias emprestadas indicadas até 'renewal_date'."""
+    validate_renewal_date(renewal_date)
+    return _apply(ids, borrower, RENEWED, {'due_back': renewal_date})
+
+
+def check_in(ids=None, borrower=None):
+    """Devolve as cópias emprestadas indicadas (ficam disponíveis)."""
+    with transaction.atomic():
+        result = _apply(ids, borrower, RETURNED,
+                        {'status': 'd', 'due_back': None, 'borrower': None})
+        counters.increment(counters.INSTANCES_AVAILABLE, len(result.done))
+    return result
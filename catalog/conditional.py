@@ -0,0 +1,109 @@
+"""Respostas condicionais (ETag / Last-Modified) das páginas do catálogo.
+
+Cada página tem um validador: uma consulta barata que retorna as datas de
+alteração (e totais) do que a página mostra.  Com ele a página responde
+304 Not Modified sem montar nem renderizar nada (mesma lógica do decorator
+condition() do Django, também p/ views assíncronas).  A ETag inclui ainda o
+endereço (página/cursor), o usuário e o segredo CSRF, pois o menu lateral
+muda conforme o login.
+"""
+import datetime
+import functools
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Max, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import counters
+from .models import Author, Book, CatalogCounter
+
+
+def _latest(model):
+    """Subconsulta com a alteração mais recente da tabela (usa o índice)."""
+    return Subquery(model.objects.order_by('-updated_at').values('updated_at')[:1])
+
+
+# Validadores: consultas (ainda não executadas) com uma única linha
+
+def book_detail(pk):
+    # Livro, autor e a cópia alterada por último (cópias removidas
+    #  atualizam o próprio livro)
+    return (Book.objects.filter(pk=pk)
+            .annotate(copies_at=Max('bookinstance__updated_at'))
+            .values_list('updated_at', 'author__updated_at', 'copies_at'))
+
+
+def author_detail(pk):
+    # Livros adicionados/removidos ou com cópias novas/removidas
+    return (Author.objects.filter(pk=pk)
+            .annotate(books_at=Max('book__updated_at'))
+            .values_list('updated_at', 'books_at'))
+
+
+def book_list():
+    # Total de livros (remoções) e última alteração de livros e autores
+    return (CatalogCounter.objects.filter(name=counters.BOOKS)
+            .annotate(books_at=_latest(Book), authors_at=_latest(Author))
+            .values_list('value', 'books_at', 'authors_at'))
+
+
+def author_list():
+    return (CatalogCounter.objects.filter(name=counters.AUTHORS)
+            .annotate(authors_at=_latest(Author))
+            .values_list('value', 'authors_at'))
+
+
+def _validators(request, values, user_pk):
+    """(ETag, Last-Modified em segundos) a partir da linha do validador."""
+    if values is None:
+        return None, None
+    parts = (request.get_full_path(), user_pk, request.META.get('CSRF_COOKIE'), *values)
+    etag = '"%s"' % hashlib.sha1(repr(parts).encode()).hexdigest()
+    dates = [value for value in values if isinstance(value, datetime.datetime)]
+    last_modified = int(max(dates).timestamp()) if dates else None
+    return etag, last_modified
+
+
+def _finish(request, response, etag, last_modified):
+    if request.method in ('GET', 'HEAD'):
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+    return response
+
+
+def page(validator):
+    """Decorator de view: 304 quando o validador não mudou.
+
+       'validator' recebe os argumentos nomeados da URL.  Sem linha
+       (objeto inexistente ou contador ainda não criado) a view responde
+       normalmente.  Aceita views síncronas e assíncronas."""
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def inner(request, *args, **kwargs):
+                values = await validator(**kwargs).afirst()
+                user_pk = await sync_to_async(lambda: request.user.pk)()
+                etag, last_modified = _validators(request, values, user_pk)
+                response = get_conditional_response(request, etag=etag,
+                                                    last_modified=last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(request, response, etag, last_modified)
+        else:
+            @functools.wraps(view)
+            def inner(request, *args, **kwargs):
+                values = validator(**kwargs).first()
+                etag, last_modified = _validators(request, values, request.user.pk)
+                response = get_conditional_response(request, etag=etag,
+                                                    last_modified=last_modified)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return _finish(request, response, etag, last_modified)
+        return inner
+
+    return decorator
@@ -0,0 +1,80 @@
+"""Contadores materializados p/ a tela inicial do catálogo.
+
+Os totais ficam na tabela CatalogCounter e são atualizados de forma
+incremental (F() + delta), evitando um COUNT(*) por tabela a cada acesso.
+"""
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F
+
+from .models import Author, Book, BookInstance, CatalogCounter
+
+BOOKS = 'books'
+INSTANCES = 'instances'
+INSTANCES_AVAILABLE = 'instances_available'
+AUTHORS = 'authors'
+# Acumulado de visitas ao site (sem tabela de origem, ver catalog/visits.py)
+SITE_VISITS = 'site_visits'
+
+# Como recalcular cada contador a partir das tabelas de origem
+SOURCES = {
+    BOOKS: lambda: Book.objects.count(),
+    INSTANCES: lambda: BookInstance.objects.count(),
+    INSTANCES_AVAILABLE: lambda: BookInstance.objects.filter(status__exact='d').count(),
+    AUTHORS: lambda: Author.objects.count(),
+}
+
+
+def get_counts():
+    """Retorna {nome: valor} com todos os contadores numa única consulta."""
+    counts = dict(CatalogCounter.objects.values_list('name', 'value'))
+
+    # Base recém criada ou contador apagado: reconstrói uma única vez
+    if any(name not in counts for name in SOURCES):
+        counts.update(rebuild())
+    return counts
+
+
+async def aget_counts():
+    """get_counts() com o ORM assíncrono."""
+    counts = {name: value async for name, value
+              in CatalogCounter.objects.values_list('name', 'value')}
+    if any(name not in counts for name in SOURCES):
+        counts.update(await sync_to_async(rebuild)())
+    return counts
+
+
+def increment(name, delta=1):
+    """Soma 'delta' ao contador 'name' sem ler o valor atual."""
+    if not delta:
+        return
+    updated = CatalogCounter.objects.filter(name=name).update(value=F('value') + delta)
+    if updated:
+        return
+
+    # Contador ainda não existe: recalcula a partir da tabela de origem ou,
+    #  se não houver uma (ex.: visitas), começa pelo próprio delta
+    if name in SOURCES:
+        rebuild([name])
+    else:
+        counter, created = CatalogCounter.objects.get_or_create(
+            name=name, defaults={'value': delta})
+        if not created:
+            CatalogCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def refresh(name):
+    """Recalcula um único contador a partir da tabela de origem."""
+    rebuild([name])
+
+
+def rebuild(names=None):
+    """Recalcula os contadores indicados (todos por padrão) do zero."""
+    names = list(names or SOURCES)
+    values = {}
+    with transaction.atomic():
+        for name in names:
+            values[name] = SOURCES[name]()
+            CatalogCounter.objects.update_or_create(
+                name=name, defaults={'value': values[name]})
+    return values
@@ -0,0 +1,144 @@
+"""Listagem de autores: paginação por busca e índice A–Z.
+
+A listagem é paginada pela chave (last_name, first_name, id), com o índice
+author_name_idx.  AuthorLetter guarda, por inicial do sobrenome, o nº de
+autores e o primeiro deles na ordem da listagem; o salto p/ uma letra é um
+cursor logo antes desse autor.  O índice é mantido de forma incremental
+pelos sinais de Author (e pela importação), sem GROUP BY a cada acesso.
+
+A ordem é a da base de dados (binária no SQLite): iniciais minúsculas ou
+acentuadas podem ficar fora do bloco da letra maiúscula; o salto leva
+sempre ao primeiro autor da letra na ordem da listagem.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Author, AuthorLetter
+from .pagination import KeysetPaginator, encode_cursor
+
+ORDERING = ('last_name', 'first_name', 'id')
+# Inicial de sobrenomes vazios
+EMPTY = '#'
+
+
+def letter(last_name):
+    """Entrada do índice de um sobrenome."""
+    return last_name[:1].upper()[:1] or EMPTY
+
+
+def _key(author):
+    return [author.last_name, author.first_name, author.pk]
+
+
+def _first_fields(author):
+    return {'first_last_name': author.last_name, 'first_first_name': author.first_name,
+            'first_id': author.pk}
+
+
+def _lower_first(initial, author):
+    """Torna 'author' o primeiro da letra se ele vier antes do atual."""
+    stored = ('first_last_name', 'first_first_name', 'first_id')
+    after = KeysetPaginator(AuthorLetter.objects.all(), 1, stored).seek_filter(_key(author), False)
+    AuthorLetter.objects.filter(after, letter=initial).update(**_first_fields(author))
+
+
+def _refresh_first(initial):
+    """Procura o primeiro autor da letra (o anterior mudou ou foi removido)."""
+    found = []
+    # Uma faixa do índice por grafia da letra (LIKE/startswith não usa o
+    #  índice no SQLite); o primeiro de cada faixa basta
+    for start in {initial, initial.lower()}:
+        author = (Author.objects.filter(last_name__gte=start, last_name__lt=chr(ord(start) + 1))
+                  .order_by(*ORDERING).first())
+        if author is not None and letter(author.last_name) == initial:
+            found.append(author)
+    if initial == EMPTY:
+        found += Author.objects.filter(last_name='').order_by(*ORDERING)[:1]
+
+    if found:
+        AuthorLetter.objects.filter(letter=initial).update(**_first_fields(min(found, key=_key)))
+    else:
+        AuthorLetter.objects.filter(letter=initial).delete()
+
+
+def add(authors):
+    """Soma autores novos (já gravados) ao índice."""
+    by_letter = {}
+    for author in authors:
+        by_letter.setdefault(letter(author.last_name), []).append(author)
+
+    for initial, members in by_letter.items():
+        first = min(members, key=_key)
+        updated = AuthorLetter.objects.filter(letter=initial).update(
+            count=F('count') + len(members))
+        if not updated:
+            try:
+                with transaction.atomic():
+                    AuthorLetter.objects.create(letter=initial, count=len(members),
+                                                **_first_fields(first))
+                continue
+            except IntegrityError:
+                # Criada por outra requisição nesse meio tempo
+                AuthorLetter.objects.filter(letter=initial).update(
+                    count=F('count') + len(members))
+        _lower_first(initial, first)
+
+
+def remove(entries):
+    """Retira do índice os autores removidos: [(letra, id)]."""
+    entries = list(entries)
+    for initial, count in Counter(initial for initial, _ in entries).items():
+        AuthorLetter.objects.filter(letter=initial).update(count=F('count') - count)
+    AuthorLetter.objects.filter(count__lte=0).delete()
+
+    for initial in {initial for initial, _ in entries}:
+        ids = [pk for other, pk in entries if other == initial]
+        if AuthorLetter.objects.filter(letter=initial, first_id__in=ids).exists():
+            _refresh_first(initial)
+
+
+def renamed(old_letter, author):
+    """Autor gravado que mudou de nome (antes com a inicial 'old_letter')."""
+    initial = letter(author.last_name)
+    if initial != old_letter:
+        remove([(old_letter, author.pk)])
+        add([author])
+    elif AuthorLetter.objects.filter(letter=initial, first_id=author.pk).exists():
+        _refresh_first(initial)
+    else:
+        _lower_first(initial, author)
+
+
+def rebuild():
+    """Recalcula o índice do zero (uma leitura ordenada dos autores)."""
+    entries = {}
+    for pk, first_name, last_name in (Author.objects.order_by(*ORDERING)
+                                      .values_list('pk', 'first_name', 'last_name').iterator()):
+        initial = letter(last_name)
+        if initial in entries:
+            entries[initial].count += 1
+        else:
+            entries[initial] = AuthorLetter(letter=initial, count=1, first_last_name=last_name,
+                                            first_first_name=first_name, first_id=pk)
+    with transaction.atomic():
+        AuthorLetter.objects.all().delete()
+        AuthorLetter.objects.bulk_create(entries.values())
+    return {initial: entry.count for initial, entry in entries.items()}
+
+
+def _jump(entry):
+    # Cursor "depois" de uma chave logo antes do primeiro autor da letra
+    cursor = encode_cursor([entry.first_last_name, entry.first_first_name, entry.first_id - 1])
+    return entry.letter, entry.count, cursor
+
+
+def letters():
+    """[(letra, nº de autores, cursor da página que começa nela)]."""
+    return [_jump(entry) for entry in AuthorLetter.objects.all()]
+
+
+async def aletters():
+    """letters() com o ORM assíncrono."""
+    return [_jump(entry) async for entry in AuthorLetter.objects.all()]
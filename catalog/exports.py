@@ -0,0 +1,117 @@
+"""Exportação em fluxo (CSV/JSONL) de livros, cópias e autores.
+
+As linhas vêm de QuerySet.values_list().iterator(chunk_size=...), então a
+memória usada não depende do tamanho da tabela.  Usado pelas views de
+exportação e pelo comando 'export_catalog'.
+"""
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+
+from .models import Author, Book, BookInstance
+
+CHUNK_SIZE = 2000
+
+# Nome da exportação -> (colunas, função que gera o queryset filtrado)
+EXPORTS = {
+    'books': (
+        ('id', 'title', 'isbn', 'author_id', 'author__first_name',
+         'author__last_name', 'language__name', 'summary'),
+        lambda filters: Book.objects.order_by('pk'),
+    ),
+    'bookinstances': (
+        ('id', 'book_id', 'book__title', 'imprint', 'status', 'due_back',
+         'borrower_id', 'borrower__username'),
+        lambda filters: _filter_instances(BookInstance.objects.order_by('pk'), filters),
+    ),
+    'authors': (
+        ('id', 'first_name', 'last_name', 'date_of_birth', 'date_of_death'),
+        lambda filters: Author.objects.order_by('pk'),
+    ),
+}
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_filters(params):
+    """Valida os filtros aceitos (status, due_after, due_before)."""
+    filters = {}
+    status = params.get('status')
+    if status:
+        codes = {code for code, _ in BookInstance.LOAN_STATUS}
+        if status not in codes:
+            raise ExportError(f'Situação inválida: {status}')
+        filters['status'] = status
+
+    for name in ('due_after', 'due_before'):
+        value = params.get(name)
+        if value:
+            try:
+                date = parse_date(value)
+            except ValueError:
+                date = None
+            if date is None:
+                raise ExportError(f'Data inválida em {name}: {value}')
+            filters[name] = date
+    return filters
+
+
+def _filter_instances(queryset, filters):
+    if 'status' in filters:
+        queryset = queryset.filter(status=filters['status'])
+    if 'due_after' in filters:
+        queryset = queryset.filter(due_back__gte=filters['due_after'])
+    if 'due_before' in filters:
+        queryset = queryset.filter(due_back__lte=filters['due_before'])
+    return queryset
+
+
+def export_rows(kind, filters=None):
+    """Retorna (colunas, iterador de tuplas) da exportação 'kind'."""
+    if kind not in EXPORTS:
+        raise ExportError(f'Exportação desconhecida: {kind}')
+    columns, queryset = EXPORTS[kind]
+    rows = queryset(filters or {}).values_list(*columns).iterator(chunk_size=CHUNK_SIZE)
+    return columns, rows
+
+
+class _Echo:
+    """Arquivo falso: csv.writer devolve cada linha em vez de acumulá-la."""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return '' if value is None else value
+
+
+def stream(kind, fmt, filters=None):
+    """Gera as linhas de texto (com quebra de linha) da exportação."""
+    if fmt not in FORMATS:
+        raise ExportError(f'Formato desconhecido: {fmt}')
+    columns, rows = export_rows(kind, filters)
+    # Nomes das colunas sem o caminho da relação (author__last_name -> author_last_name)
+    header = [column.replace('__', '_') for column in columns]
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow([_plain(value) for value in row])
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder,
+                             ensure_ascii=False) + '\n'
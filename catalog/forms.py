@@ -1,10 +1,14 @@
 import datetime
+import uuid
 
 from django import forms
 
+from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
+from catalog.circulation import validate_renewal_date
+
 class RenewBookForm(forms.Form):
     renewal_date = forms.DateField(
         help_text="Digite uma data entre agora e 4 semanas (padrão 3).")
@@ -12,13 +16,78 @@ class RenewBookForm(forms.Form):
     def clean_renewal_date(self):
         data = self.cleaned_data['renewal_date']
 
-        # Data no passado?
-        if data < datetime.date.today():
-            raise ValidationError(_('Data inválida - renovação no passado'))
-
-        # Data dentro do intervalo de tempo permitido?
-        if data > datetime.date.today() + datetime.timedelta(weeks=4):
-            raise ValidationError(_('Data inválida - renovação com mais de 4 semanas adiante'))
+        # Mesmas regras da renovação em lote (catalog/circulation.py)
+        validate_renewal_date(data)
 
         # Retorna data limpa/sanitizada
         return data
+
+
+class MultipleUUIDField(forms.Field):
+    """Lista de UUIDs vinda de vários campos com o mesmo nome (checkboxes)."""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return [uuid.UUID(str(item)) for item in value or []]
+        except ValueError:
+            raise ValidationError(_('Cópia inválida'))
+
+
+class BulkLoanForm(forms.Form):
+    """Renovação ou devolução de várias cópias (selecionadas ou todas as
+       emprestadas a um usuário)."""
+    RENEW = 'renew'
+    RETURN = 'return'
+
+    action = forms.ChoiceField(choices=((RENEW, 'Renovar'), (RETURN, 'Devolver')))
+    renewal_date = forms.DateField(required=False,
+                                   help_text="P/ renovar: entre agora e 4 semanas.")
+    ids = MultipleUUIDField(required=False)
+    borrower = forms.CharField(required=False, label='Todos os empréstimos de',
+                               help_text="Nome de usuário (em vez de selecionar cópias).")
+
+    def clean_borrower(self):
+        username = self.cleaned_data['borrower'].strip()
+        if not username:
+            return None
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise ValidationError(_('Usuário não encontrado'))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('ids') and not cleaned_data.get('borrower') \
+                and 'borrower' not in self.errors:
+            raise ValidationError(_('Selecione cópias ou informe um usuário'))
+
+        if cleaned_data.get('action') == self.RENEW:
+            renewal_date = cleaned_data.get('renewal_date')
+            if renewal_date is None:
+                self.add_error('renewal_date', _('Informe a data de renovação'))
+            else:
+                try:
+                    validate_renewal_date(renewal_date)
+                except ValidationError as error:
+                    self.add_error('renewal_date', error)
+        return cleaned_data
+
+
+class ReportPeriodForm(forms.Form):
+    """Intervalo do relatório de circulação (padrão: últimos 12 meses)."""
+    MAX_DAYS = 3 * 366
+
+    start = forms.DateField(label='De', required=False)
+    end = forms.DateField(label='Até', required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        end = cleaned_data.get('end') or datetime.date.today()
+        start = cleaned_data.get('start') or (end - datetime.timedelta(days=364)).replace(day=1)
+        if start > end:
+            raise ValidationError(_('Data inicial depois da final'))
+        if (end - start).days > self.MAX_DAYS:
+            raise ValidationError(_('Intervalo máximo de 3 anos'))
+        cleaned_data.update(start=start, end=end)
+        return cleaned_data
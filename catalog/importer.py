@@ -0,0 +1,242 @@
+"""Importação em massa do catálogo a partir de CSV ou JSONL.
+
+Os registros são lidos como fluxo e processados em lotes: cada lote resolve
+gêneros, idiomas e autores com poucas consultas e insere livros, gêneros dos
+livros e cópias com bulk_create dentro de uma transação.  Livros cujo ISBN
+já existe são ignorados, o que torna a importação idempotente e retomável.
+
+Campos de cada registro (cabeçalho no CSV, chaves no JSONL):
+    title, isbn, summary, author_first_name, author_last_name,
+    genres (separados por ';' no CSV ou lista no JSONL), language,
+    copies, imprint, status
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from . import availability, counters, directory, lookups, object_cache, search
+from .models import Author, Book, BookInstance, Genre, Language
+
+STATUS_CODES = {code for code, _ in BookInstance.LOAN_STATUS}
+
+# Limite de autores mantidos em memória entre lotes
+AUTHOR_CACHE_SIZE = 50000
+
+
+@dataclass(frozen=True)
+class InvalidRecord:
+    """Linha que não pôde ser lida: vira um erro da importação, não a interrompe."""
+    reason: str
+
+
+def read_records(stream, fmt):
+    """Gera dicionários a partir de um arquivo CSV ou JSONL, linha a linha
+       (InvalidRecord p/ as linhas JSONL malformadas)."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield InvalidRecord(f'JSON inválido ({exc})')
+                continue
+            yield record if isinstance(record, dict) else InvalidRecord('JSON não é um objeto')
+    else:
+        raise ValueError(f'Formato desconhecido: {fmt}')
+
+
+def _text(record, key, max_length=None):
+    value = (record.get(key) or '').strip()
+    return value[:max_length] if max_length else value
+
+
+def _genres(record):
+    value = record.get('genres') or []
+    if isinstance(value, str):
+        value = value.split(';')
+    return [name.strip() for name in value if name and name.strip()]
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    books: int = 0
+    copies: int = 0
+    authors: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+
+class CatalogImporter:
+    """Importa registros em lotes de 'chunk_size' linhas."""
+
+    def __init__(self, chunk_size=1000, on_chunk=None):
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+        self.stats = ImportStats()
+        # Tabelas pequenas: carregadas uma vez, chave em minúsculas
+        #  (como as restrições Lower('name') dos modelos)
+        self.genres = {name.lower(): pk for pk, name in Genre.objects.values_list('pk', 'name')}
+        self.languages = {name.lower(): pk for pk, name in Language.objects.values_list('pk', 'name')}
+        self.authors = {}
+
+    def run(self, records, skip=0):
+        """Importa 'records', ignorando as 'skip' primeiras linhas."""
+        chunk = []
+        for number, record in enumerate(records, 1):
+            if number <= skip:
+                continue
+            chunk.append((number, record))
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        if chunk:
+            self._flush(chunk)
+        return self.stats
+
+    def _flush(self, chunk):
+        with transaction.atomic():
+            self._import_chunk(chunk)
+        self.stats.rows += len(chunk)
+        if self.on_chunk:
+            # Último número de linha já gravado, p/ retomar a importação
+            self.on_chunk(chunk[-1][0], self.stats)
+
+    def _import_chunk(self, chunk):
+        rows = []
+        seen = set()
+        for number, record in chunk:
+            if isinstance(record, InvalidRecord):
+                self.stats.errors.append((number, record.reason))
+                continue
+            title, isbn = _text(record, 'title', 200), _text(record, 'isbn', 13)
+            if not title or not isbn:
+                self.stats.errors.append((number, 'título ou ISBN ausente'))
+                continue
+            try:
+                copies = int(record.get('copies') or 0)
+            except (TypeError, ValueError):
+                self.stats.errors.append(
+                    (number, f'número de cópias inválido: {record.get("copies")!r}'))
+                continue
+            if isbn in seen:
+                self.stats.skipped += 1
+                continue
+            seen.add(isbn)
+            rows.append(record | {'title': title, 'isbn': isbn, 'copies': copies})
+
+        # ISBN já cadastrado: livro importado antes (retomada) ou existente
+        existing = set(Book.objects.filter(isbn__in=seen).values_list('isbn', flat=True))
+        self.stats.skipped += len(existing)
+        rows = [row for row in rows if row['isbn'] not in existing]
+        if not rows:
+            return
+
+        genre_ids = self._resolve_lookup(Genre, self.genres,
+                                         [name for row in rows for name in _genres(row)])
+        language_ids = self._resolve_lookup(Language, self.languages,
+                                            [_text(row, 'language') for row in rows])
+        author_ids = self._resolve_authors(rows)
+
+        books = Book.objects.bulk_create([
+            Book(
+                title=row['title'],
+                isbn=row['isbn'],
+                summary=_text(row, 'summary', 1000),
+                author_id=author_ids.get(self._author_key(row)),
+                language_id=language_ids.get(_text(row, 'language').lower()),
+            )
+            for row in rows
+        ])
+
+        Book.genre.through.objects.bulk_create([
+            Book.genre.through(book_id=book.pk, genre_id=genre_id)
+            for book, row in zip(books, rows)
+            for genre_id in {genre_ids[name.lower()] for name in _genres(row)}
+        ])
+
+        copies = []
+        for book, row in zip(books, rows):
+            status = _text(row, 'status') or 'd'
+            status = status if status in STATUS_CODES else 'd'
+            for _ in range(row['copies']):
+                copies.append(BookInstance(book_id=book.pk, imprint=_text(row, 'imprint', 200),
+                                           status=status))
+        BookInstance.objects.bulk_create(copies)
+
+        # bulk_create não envia sinais: atualiza os dados derivados aqui
+        counters.increment(counters.BOOKS, len(books))
+        counters.increment(counters.INSTANCES, len(copies))
+        counters.increment(counters.INSTANCES_AVAILABLE,
+                           sum(copy.status == 'd' for copy in copies))
+        availability.moved([(None, None, copy.book_id, copy.status) for copy in copies])
+        search.index_books([book.pk for book in books])
+        # Páginas dos autores que ganharam livros
+        object_cache.invalidate('author', {book.author_id for book in books})
+
+        self.stats.books += len(books)
+        self.stats.copies += len(copies)
+
+    def _resolve_lookup(self, model, cache, names):
+        """Ids de gêneros/idiomas pelo nome (sem distinção de maiúsculas),
+           criando os que faltam com um único bulk_create."""
+        missing = {}
+        for name in names:
+            if name and name.lower() not in cache:
+                missing.setdefault(name.lower(), name)
+        if missing:
+            created = model.objects.bulk_create([model(name=name) for name in missing.values()])
+            cache.update({obj.name.lower(): obj.pk for obj in created})
+            # bulk_create não dispara sinais (ver catalog/lookups.py)
+            lookups.invalidate()
+        return cache
+
+    @staticmethod
+    def _author_key(row):
+        first = _text(row, 'author_first_name', 100)
+        last = _text(row, 'author_last_name', 100)
+        return Author.name_key_for(first, last) if first or last else None
+
+    def _resolve_authors(self, rows):
+        """Ids dos autores do lote: uma consulta p/ os conhecidos (pela chave
+           de nome em minúsculas, com índice) e um bulk_create p/ os novos."""
+        wanted = {}
+        for row in rows:
+            key = self._author_key(row)
+            if key and key not in self.authors:
+                wanted.setdefault(key, (_text(row, 'author_first_name', 100),
+                                        _text(row, 'author_last_name', 100)))
+
+        if wanted:
+            found = (Author.objects.filter(name_key__in=wanted)
+                     .order_by('pk').values_list('name_key', 'pk'))
+            for key, pk in found:
+                self.authors.setdefault(key, pk)
+
+            new = [key for key in wanted if key not in self.authors]
+            created = Author.objects.bulk_create([
+                Author(first_name=wanted[key][0], last_name=wanted[key][1], name_key=key)
+                for key in new
+            ])
+            self.authors.update({key: author.pk for key, author in zip(new, created)})
+            counters.increment(counters.AUTHORS, len(created))
+            directory.add(created)
+            self.stats.authors += len(created)
+
+        ids = {key: self.authors[key] for key in map(self._author_key, rows) if key}
+        if len(self.authors) > AUTHOR_CACHE_SIZE:
+            self.authors.clear()
+        return ids
@@ -0,0 +1,94 @@
+"""Cache local do processo p/ as tabelas pequenas de Genre e Language.
+
+Cada processo guarda todas as linhas das duas tabelas em memória, lidas de
+uma vez.  Uma chave de versão no cache do Django (compartilhado entre os
+processos com FileBasedCache, ver CATALOG_CACHE_DIR) é trocada pelos sinais
+a cada gravação ou remoção; o processo que encontra uma versão diferente da
+sua relê a tabela.
+
+Gêneros e idioma de uma página de livros saem da memória a partir dos ids
+(attach()), e os formulários do admin montam as opções com choices().
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Book, Genre, Language
+
+VERSION_KEY = 'catalog:lookups:version'
+MODELS = (Genre, Language)
+
+_lock = threading.Lock()
+# {modelo: (versão, {id: objeto})}
+_tables = {}
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Cache vazio (ou expulso): versão nova, nunca a de uma cópia antiga
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def table(model):
+    """{id: objeto} com todas as linhas de 'model', na ordem do id."""
+    version = _version()
+    loaded = _tables.get(model)
+    if loaded is not None and loaded[0] == version:
+        return loaded[1]
+
+    with _lock:
+        rows = {obj.pk: obj for obj in model.objects.order_by('pk')}
+        _tables[model] = (version, rows)
+    return rows
+
+
+def get(model, pk):
+    """Objeto 'pk' de 'model', ou None."""
+    return table(model).get(pk) if pk is not None else None
+
+
+def attach(books, language=True):
+    """Preenche 'genre_list' (e o idioma, com 'language') de cada livro a
+       partir da memória: só a tabela de ligação livro-gênero é lida (uma
+       consulta)."""
+    books = [book for book in books if book.pk is not None]
+    if not books:
+        return books
+
+    genres = table(Genre)
+    genre_ids = {book.pk: [] for book in books}
+    for book_id, genre_id in (Book.genre.through.objects
+                              .filter(book_id__in=genre_ids).values_list('book_id', 'genre_id')):
+        genre_ids[book_id].append(genre_id)
+
+    for book in books:
+        book.genre_list = [genres[pk] for pk in sorted(genre_ids[book.pk]) if pk in genres]
+    if language:
+        languages = table(Language)
+        language_field = Book._meta.get_field('language')
+        for book in books:
+            # Idioma fora da tabela em memória: fica a consulta normal do FK
+            if book.language_id is None or book.language_id in languages:
+                language_field.set_cached_value(book, languages.get(book.language_id))
+    return books
+
+
+def choices(model, empty_label=None):
+    """Opções de um campo de formulário que aponta p/ 'model'."""
+    options = [(obj.pk, str(obj)) for obj in table(model).values()]
+    return options if empty_label is None else [('', empty_label), *options]
+
+
+def _bump():
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate():
+    """Troca a versão (agora e após o commit): todos os processos relêem."""
+    _bump()
+    transaction.on_commit(_bump)
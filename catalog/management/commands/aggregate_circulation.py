@@ -0,0 +1,38 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+
+from catalog import analytics
+
+
+class Command(BaseCommand):
+    help = ('Soma os eventos de circulação novos (desde a última execução) aos '
+            'totais diários lidos pelo relatório de circulação.  Pode rodar '
+            'periodicamente (cron): uma execução simultânea espera a outra '
+            'terminar o lote (até o busy_timeout da base, ver catalog/sqlite.py).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=analytics.BATCH_SIZE,
+                            help=f'Eventos por transação (padrão {analytics.BATCH_SIZE})')
+        parser.add_argument('--settle', type=float,
+                            default=analytics.SETTLE.total_seconds(),
+                            help='Ignora eventos mais novos que estes segundos '
+                                 f'(padrão {analytics.SETTLE.total_seconds():g})')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Apaga os totais e soma todo o registro de novo')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['settle'] < 0:
+            raise CommandError('--batch-size deve ser positivo e --settle, não negativo.')
+
+        settle = datetime.timedelta(seconds=options['settle'])
+        try:
+            if options['rebuild']:
+                count = analytics.rebuild(options['batch_size'], settle)
+            else:
+                count = analytics.aggregate(options['batch_size'], settle)
+        except OperationalError as exc:
+            # Base travada além do busy_timeout (ex.: outra agregação longa)
+            raise CommandError(f'Base ocupada, tente de novo mais tarde: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'{count} evento(s) somado(s) aos totais diários.'))
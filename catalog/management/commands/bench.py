@@ -0,0 +1,94 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+
+from catalog.benchmarks import (catalog_targets, leave_no_trace, percentiles, profile_request,
+                                throwaway_database)
+
+
+class Command(BaseCommand):
+    help = ('Mede latência (p50/p95/p99), consultas e linhas lidas de cada '
+            'rota do catálogo, opcionalmente comparando com uma linha de base.  '
+            'Roda numa cópia temporária da base (SQLite) e numa transação '
+            'desfeita ao final: a base não muda.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Requisições medidas por rota (padrão 50)')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--only', action='append',
+                            help='Mede apenas a(s) rota(s) indicada(s)')
+        parser.add_argument('--save', help='Grava o resultado em JSON')
+        parser.add_argument('--compare', help='Linha de base JSON p/ comparar')
+        parser.add_argument('--threshold', type=float, default=20.0,
+                            help='Piora do p95 (em %%) considerada regressão')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests deve ser positivo.')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as handle:
+                baseline = json.load(handle)
+
+        # O cliente de testes se apresenta como 'testserver'; tudo o que as
+        #  requisições gravam (bibliotecário, sessões, visitas) é desfeito
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), \
+                throwaway_database(), leave_no_trace(), transaction.atomic():
+            results, regressions = self._run(options, baseline)
+            transaction.set_rollback(True)
+
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2, sort_keys=True)
+            self.stdout.write(f'Resultado gravado em {options["save"]}.')
+
+        if regressions:
+            raise CommandError(f'Regressão de p95 em: {", ".join(regressions)}')
+
+    def _run(self, options, baseline):
+        results = {}
+        regressions = []
+        for name, url, user in catalog_targets():
+            if options['only'] and name not in options['only']:
+                continue
+
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+
+            for _ in range(options['warmup']):
+                client.get(url)
+
+            samples = []
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                response = client.get(url)
+                samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f'{url} respondeu {response.status_code}.')
+
+            queries, rows = profile_request(client, url)
+            results[name] = percentiles(samples) | {'queries': queries, 'rows': rows}
+            self.stdout.write(self._line(name, results[name], baseline))
+
+            previous = (baseline or {}).get(name)
+            if previous and results[name]['p95'] > previous['p95'] * (1 + options['threshold'] / 100):
+                regressions.append(name)
+        return results, regressions
+
+    def _line(self, name, result, baseline):
+        line = (f'{name:22} p50 {result["p50"]:7.2f}ms  p95 {result["p95"]:7.2f}ms  '
+                f'p99 {result["p99"]:7.2f}ms  {result["queries"]:3} consultas  '
+                f'{result["rows"]:6} linhas')
+        previous = (baseline or {}).get(name)
+        if previous:
+            delta = (result['p95'] - previous['p95']) / previous['p95'] * 100 if previous['p95'] else 0
+            line += (f'  (p95 {delta:+.0f}%, consultas '
+                     f'{result["queries"] - previous["queries"]:+d})')
+        return line
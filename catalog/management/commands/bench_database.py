@@ -0,0 +1,89 @@
+import json
+import os
+import sqlite3
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import override_settings
+
+from catalog import sqlite
+from catalog.benchmarks import mixed_load, percentiles
+
+
+class Command(BaseCommand):
+    help = ('Compara os perfis de conexão SQLite (catalog/sqlite.py) sob carga '
+            'mista: threads lendo a listagem de livros enquanto outras gravam. '
+            'Cada perfil roda numa cópia temporária da base; mostra leituras/s, '
+            'gravações/s e latência das leituras.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8,
+                            help='Threads de leitura (padrão 8)')
+        parser.add_argument('--writers', type=int, default=2,
+                            help='Threads de escrita (padrão 2)')
+        parser.add_argument('--write-interval', type=float, default=0.01,
+                            help='Pausa entre gravações de cada thread, em segundos '
+                                 '(padrão 0.01)')
+        parser.add_argument('--duration', type=float, default=5,
+                            help='Segundos de carga por perfil (padrão 5)')
+        parser.add_argument('--save', help='Grava o resultado em JSON')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Os perfis de conexão valem apenas para o SQLite.')
+        if options['readers'] < 1 or options['writers'] < 0 or options['duration'] <= 0:
+            raise CommandError('--readers e --duration devem ser positivos.')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in sqlite.PROFILES:
+                results[profile] = self._measure(profile, directory, options)
+                self.stdout.write(self._line(profile, results[profile]))
+
+        plain, tuned = results['plain'], results['tuned']
+        if plain['reads_per_second']:
+            self.stdout.write(f'Leituras: {tuned["reads_per_second"] / plain["reads_per_second"]:.2f}x '
+                              'com o perfil tuned.')
+
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2, sort_keys=True)
+            self.stdout.write(f'Resultado gravado em {options["save"]}.')
+
+    def _measure(self, profile, directory, options):
+        # Cópia da base (API de backup do SQLite) numa conexão à parte: a base
+        #  em uso não recebe gravações nem muda de journal_mode
+        path = os.path.join(directory, f'{profile}.sqlite3')
+        connection.ensure_connection()
+        with sqlite3.connect(path) as target:
+            connection.connection.backup(target)
+        target.close()
+
+        alias = f'bench_{profile}'
+        connections.settings[alias] = {**connections.settings['default'], 'NAME': path}
+        try:
+            with override_settings(CATALOG_DB_PROFILE=profile):
+                journal_mode = sqlite.pragmas(connections[alias])['journal_mode']
+                load = mixed_load(options['readers'], options['writers'], options['duration'],
+                                  options['write_interval'], using=alias)
+        finally:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+        return {
+            'journal_mode': journal_mode,
+            'reads_per_second': len(load['reads']) / load['elapsed'],
+            'writes_per_second': len(load['writes']) / load['elapsed'],
+            'errors': load['errors'],
+            'read_latency': percentiles(load['reads']) if load['reads'] else None,
+        }
+
+    def _line(self, profile, result):
+        latency = result['read_latency'] or {'p50': 0, 'p95': 0}
+        return (f'{profile:6} ({result["journal_mode"]:6})  '
+                f'{result["reads_per_second"]:9.1f} leituras/s  '
+                f'{result["writes_per_second"]:8.1f} gravações/s  '
+                f'leitura p50 {latency["p50"]:6.2f}ms  p95 {latency["p95"]:6.2f}ms  '
+                f'erros {result["errors"]}')
@@ -0,0 +1,65 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from catalog.benchmarks import (catalog_targets, leave_no_trace, load_asgi, load_wsgi,
+                                percentiles, throwaway_database)
+
+HANDLERS = {
+    # Views síncronas (catalog/views.py)
+    'wsgi': ('locallibrary.urls', load_wsgi),
+    # Views assíncronas (catalog/async_views.py), como em locallibrary/asgi.py
+    'asgi': ('locallibrary.asgi_urls', load_asgi),
+}
+
+
+class Command(BaseCommand):
+    help = ('Compara WSGI (views síncronas, threads) e ASGI (views assíncronas, '
+            'laço de eventos) sob carga concorrente: requisições/s e latência '
+            'p50/p95/p99 de cada rota, no próprio processo, numa cópia '
+            'temporária da base (SQLite).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requisições por rota e servidor (padrão 200)')
+        parser.add_argument('--concurrency', type=int, default=10,
+                            help='Requisições simultâneas (padrão 10)')
+        parser.add_argument('--only', action='append',
+                            help='Mede apenas a(s) rota(s) indicada(s)')
+        parser.add_argument('--save', help='Grava o resultado em JSON')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests e --concurrency devem ser positivos.')
+
+        results = {}
+        # O cliente de testes se apresenta como 'testserver'.  Threads com
+        #  conexões próprias: sem transação a desfazer; sem a cópia da base,
+        #  leave_no_trace() apaga o que as requisições criam
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), \
+                throwaway_database(), leave_no_trace():
+            for name, url, user in catalog_targets():
+                if options['only'] and name not in options['only']:
+                    continue
+                results[name] = {}
+                for handler, (urlconf, load) in HANDLERS.items():
+                    with override_settings(ROOT_URLCONF=urlconf):
+                        # Aquecimento: caches e conexões
+                        load(url, user, options['concurrency'], options['concurrency'])
+                        samples, elapsed = load(url, user, options['requests'],
+                                                options['concurrency'])
+                    results[name][handler] = percentiles(samples) | {
+                        'rps': len(samples) / elapsed}
+                    self.stdout.write(self._line(name, handler, results[name][handler]))
+
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2, sort_keys=True)
+            self.stdout.write(f'Resultado gravado em {options["save"]}.')
+
+    def _line(self, name, handler, result):
+        return (f'{name:22} {handler}  {result["rps"]:8.1f} req/s  '
+                f'p50 {result["p50"]:7.2f}ms  p95 {result["p95"]:7.2f}ms  '
+                f'p99 {result["p99"]:7.2f}ms')
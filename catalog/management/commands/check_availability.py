@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import availability
+
+
+class Command(BaseCommand):
+    help = ('Compara os contadores de disponibilidade dos livros (cópias, '
+            'disponíveis, emprestadas) com as cópias cadastradas.  Com '
+            '--repair, recalcula os livros com diferença.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true',
+                            help='Corrige os contadores com diferença')
+
+    def handle(self, *args, **options):
+        drifted = availability.drift()
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Contadores de disponibilidade em dia.'))
+            return
+
+        for book_id, columns in drifted:
+            details = ', '.join(f'{column}: {stored} (correto {correct})'
+                                for column, (stored, correct) in columns.items())
+            self.stdout.write(f'Livro {book_id}: {details}')
+
+        if not options['repair']:
+            raise CommandError(f'{len(drifted)} livro(s) com contadores incorretos; '
+                               'use --repair para corrigir.')
+        availability.refresh([book_id for book_id, _ in drifted])
+        self.stdout.write(self.style.SUCCESS(f'{len(drifted)} livro(s) corrigido(s).'))
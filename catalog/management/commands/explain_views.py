@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from catalog import directory, views
+from catalog.models import Author, AuthorLetter, Book, BookInstance, CatalogCounter
+from catalog.pagination import KeysetPaginator
+
+ZERO_UUID = '00000000-0000-0000-0000-000000000000'
+
+
+def view_querysets(book_id, author_id, user_id):
+    """Consultas executadas por cada view do catálogo (nome -> queryset)."""
+    book_detail = views.BookDetailView().get_queryset()
+    author_books = Book.objects.order_by('title')
+    books, ordering, _ = views.book_list_query({})
+    by_availability, _, _ = views.book_list_query({'sort': 'available'})
+    in_stock, _, _ = views.book_list_query({'available': '1'})
+    loans = BookInstance.objects.on_loan().order_by('due_back', 'id')
+    my_loans = loans.filter(borrower_id=user_id)
+
+    # Páginas seguintes da paginação por busca (cursor no meio da tabela)
+    keyset_books = KeysetPaginator(books, 10, ordering)
+    keyset_loans = KeysetPaginator(loans, 10, ('due_back', 'id'))
+    authors = Author.objects.order_by(*directory.ORDERING)
+    keyset_authors = KeysetPaginator(authors, 20, directory.ORDERING)
+
+    return {
+        'index': CatalogCounter.objects.all(),
+        'books': books[:10],
+        'books (cursor)': books.filter(keyset_books.seek_filter(['M', 0], False))[:11],
+        'books (disponíveis primeiro)': by_availability[:10],
+        'books (só disponíveis)': in_stock[:10],
+        'book-detail': book_detail.filter(pk=book_id),
+        'book-detail (cópias)': BookInstance.objects.filter(book_id__in=[book_id])
+                                .order_by('due_back', 'id'),
+        'authors': authors[:21],
+        'authors (cursor)': authors.filter(keyset_authors.seek_filter(['M', '', 0], False))[:21],
+        # Uma linha por letra: varredura esperada
+        'authors (letras)': AuthorLetter.objects.all(),
+        'author-detail': Author.objects.filter(pk=author_id),
+        'author-detail (livros)': author_books.filter(author_id__in=[author_id]),
+        'my-borrowed': my_loans[:10],
+        'borrowed-books': loans.select_related('book', 'borrower')[:10],
+        'borrowed-books (cursor)': loans.filter(
+            keyset_loans.seek_filter(['2000-01-01', ZERO_UUID], False))[:11],
+        'overdue-loans': BookInstance.objects.overdue().order_by('borrower', 'due_back', 'id')[:50],
+        'renew-book-librarian': BookInstance.objects.filter(pk=ZERO_UUID),
+    }
+
+
+def full_scans(plan):
+    """Linhas do plano que percorrem uma tabela inteira sem índice."""
+    flagged = []
+    for line in plan.splitlines():
+        if connection.vendor == 'postgresql':
+            if 'Seq Scan' in line:
+                flagged.append(line.strip())
+        elif 'SCAN' in line and 'USING' not in line and 'CONSTANT ROW' not in line:
+            flagged.append(line.strip())
+    return flagged
+
+
+class Command(BaseCommand):
+    help = ('Mostra o plano de execução (EXPLAIN QUERY PLAN) das consultas de '
+            'cada view do catálogo e aponta as que varrem tabelas inteiras.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strict', action='store_true',
+                            help='Falha se alguma consulta varrer uma tabela inteira')
+        parser.add_argument('--allow', action='append', default=['index', 'authors (letras)'],
+                            help='Views em que a varredura é esperada '
+                                 '(padrão: index, authors (letras))')
+
+    def handle(self, *args, **options):
+        book_id = Book.objects.values_list('pk', flat=True).first() or 0
+        author_id = Author.objects.values_list('pk', flat=True).first() or 0
+        user_id = BookInstance.objects.exclude(borrower=None) \
+            .values_list('borrower_id', flat=True).first() or 0
+
+        failures = []
+        for name, queryset in view_querysets(book_id, author_id, user_id).items():
+            plan = queryset.explain()
+            scans = full_scans(plan)
+            if scans and name not in options['allow']:
+                failures.append(name)
+                status = self.style.ERROR('VARREDURA')
+            else:
+                status = self.style.SUCCESS('OK')
+            self.stdout.write(f'{name}: {status}')
+            for line in plan.splitlines():
+                self.stdout.write(f'    {line}')
+
+        if failures and options['strict']:
+            raise CommandError(f'Consultas sem índice: {", ".join(failures)}')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import exports
+
+
+class Command(BaseCommand):
+    help = 'Exporta livros, cópias ou autores em CSV ou JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--output', help='Arquivo de saída (padrão: saída padrão)')
+        parser.add_argument('--status', help='Situação das cópias (m, e, d, r)')
+        parser.add_argument('--due-after', help='Devolução a partir de (AAAA-MM-DD)')
+        parser.add_argument('--due-before', help='Devolução até (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            filters = exports.parse_filters(options)
+        except exports.ExportError as error:
+            raise CommandError(error)
+
+        lines = exports.stream(options['kind'], options['format'], filters)
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importer import CatalogImporter, read_records
+
+
+class Command(BaseCommand):
+    help = 'Importa livros, autores e cópias de um arquivo CSV ou JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo .csv ou .jsonl')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Formato do arquivo (padrão: pela extensão)')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Registros por lote/transação (padrão 1000)')
+        parser.add_argument('--checkpoint',
+                            help='Arquivo onde gravar a última linha importada')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continua a partir da linha gravada em --checkpoint')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        if fmt not in ('csv', 'jsonl'):
+            raise CommandError('Informe --format csv ou jsonl.')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size deve ser positivo.')
+
+        checkpoint = options['checkpoint']
+        if options['resume'] and not checkpoint:
+            raise CommandError('--resume exige --checkpoint.')
+
+        skip = 0
+        if options['resume'] and os.path.exists(checkpoint):
+            skip = int(Path(checkpoint).read_text().strip() or 0)
+            self.stdout.write(f'Retomando após a linha {skip}.')
+
+        def on_chunk(last_row, stats):
+            if checkpoint:
+                Path(checkpoint).write_text(str(last_row))
+            self.stdout.write(f'{last_row} linhas, {stats.books} livros, '
+                              f'{stats.rows_per_second:.0f} linhas/s')
+
+        importer = CatalogImporter(chunk_size=options['chunk_size'], on_chunk=on_chunk)
+        with path.open(newline='', encoding='utf-8') as stream:
+            stats = importer.run(read_records(stream, fmt), skip=skip)
+
+        for number, message in stats.errors:
+            self.stderr.write(f'Linha {number}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats.books} livros, {stats.copies} cópias e {stats.authors} autores '
+            f'importados; {stats.skipped} ignorados ({stats.rows_per_second:.0f} linhas/s).'))
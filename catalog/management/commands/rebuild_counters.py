@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from catalog import counters, directory
+
+
+class Command(BaseCommand):
+    help = 'Recalcula do zero os contadores materializados do catálogo.'
+
+    def handle(self, *args, **options):
+        values = counters.rebuild()
+        for name, value in sorted(values.items()):
+            self.stdout.write(f'{name}: {value}')
+        letters = directory.rebuild()
+        self.stdout.write(f'índice de autores: {len(letters)} letra(s)')
+        self.stdout.write(self.style.SUCCESS('Contadores reconstruídos.'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from catalog import search
+
+
+class Command(BaseCommand):
+    help = 'Recria o índice de busca textual (FTS5) do catálogo.'
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write(self.style.WARNING(
+                'Base de dados sem FTS5; a busca usa consultas simples.'))
+            return
+
+        total = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'{total} livros indexados.'))
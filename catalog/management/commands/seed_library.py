@@ -0,0 +1,140 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from catalog import availability, counters, directory, lookups, object_cache, search
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+GENRES = ['Romance', 'Ficção científica', 'Fantasia', 'Poesia', 'Drama',
+          'Biografia', 'História', 'Suspense', 'Infantil', 'Ensaio']
+LANGUAGES = ['Português', 'Inglês', 'Espanhol', 'Francês', 'Alemão', 'Italiano']
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela',
+               'Heitor', 'Isabela', 'João', 'Larissa', 'Marcos', 'Natália', 'Otávio',
+               'Paula', 'Rafael', 'Sofia', 'Tiago', 'Vitória', 'Yuri']
+LAST_NAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves',
+              'Pereira', 'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho',
+              'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa']
+WORDS = ['sombra', 'mar', 'cidade', 'tempo', 'noite', 'jardim', 'segredo', 'viagem',
+         'memória', 'silêncio', 'fogo', 'rio', 'casa', 'estrela', 'vento', 'caminho',
+         'sertão', 'ilha', 'espelho', 'labirinto', 'carta', 'sonho', 'deserto', 'luz']
+IMPRINTS = ['Companhia das Letras', 'Record', 'Rocco', 'Ática', 'Globo', 'Intrínseca']
+
+# Distribuição das situações das cópias: disponível, emprestada, reservada, manutenção
+STATUS_WEIGHTS = (('d', 50), ('e', 30), ('r', 10), ('m', 10))
+
+
+class Command(BaseCommand):
+    help = 'Preenche a base com dados sintéticos realistas (inserções em massa).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1000)
+        parser.add_argument('--copies', type=int, default=3000,
+                            help='Total de cópias distribuídas entre os livros')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--authors', type=int,
+                            help='Total de autores (padrão: livros / 5)')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Semente do gerador, p/ dados reproduzíveis')
+        parser.add_argument('--skip-search', action='store_true',
+                            help='Não reconstrói o índice de busca ao final')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        chunk = options['chunk_size']
+        started = time.monotonic()
+
+        genres = self._lookups(Genre, GENRES)
+        languages = self._lookups(Language, LANGUAGES)
+
+        # Senha calculada uma única vez (o hash é lento de propósito)
+        password = make_password('senha-123')
+        first_user = (User.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        User.objects.bulk_create((
+            User(username=f'leitor{first_user + i}', email=f'leitor{first_user + i}@example.com',
+                 first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                 password=password)
+            for i in range(options['users'])), batch_size=chunk)
+        user_ids = list(User.objects.values_list('pk', flat=True))
+
+        num_authors = options['authors'] or max(1, options['books'] // 5)
+        def author():
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            # bulk_create não chama save(), que preenche a chave do nome
+            return Author(first_name=first_name, last_name=last_name,
+                          name_key=Author.name_key_for(first_name, last_name),
+                          date_of_birth=datetime.date(rng.randint(1800, 1990), rng.randint(1, 12),
+                                                      rng.randint(1, 28)))
+
+        Author.objects.bulk_create((author() for _ in range(num_authors)), batch_size=chunk)
+        author_ids = list(Author.objects.values_list('pk', flat=True))
+
+        first_book = (Book.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        book_ids = []
+        for start in range(0, options['books'], chunk):
+            size = min(chunk, options['books'] - start)
+            with transaction.atomic():
+                books = Book.objects.bulk_create([
+                    Book(title=self._title(rng), summary=self._summary(rng),
+                         isbn=f'{9780000000000 + first_book + start + i}',
+                         author_id=rng.choice(author_ids),
+                         language_id=rng.choice(languages))
+                    for i in range(size)
+                ])
+                Book.genre.through.objects.bulk_create([
+                    Book.genre.through(book_id=book.pk, genre_id=genre_id)
+                    for book in books
+                    for genre_id in rng.sample(genres, rng.randint(1, 3))
+                ])
+            book_ids.extend(book.pk for book in books)
+            self.stdout.write(f'{len(book_ids)} livros')
+
+        today = datetime.date.today()
+        statuses, weights = zip(*STATUS_WEIGHTS)
+        for start in range(0, options['copies'] if book_ids else 0, chunk):
+            size = min(chunk, options['copies'] - start)
+            copies = []
+            for _ in range(size):
+                status = rng.choices(statuses, weights)[0]
+                copy = BookInstance(book_id=rng.choice(book_ids), imprint=rng.choice(IMPRINTS),
+                                    status=status)
+                if status in ('e', 'r') and user_ids:
+                    copy.borrower_id = rng.choice(user_ids)
+                    copy.due_back = today + datetime.timedelta(days=rng.randint(-20, 28))
+                copies.append(copy)
+            with transaction.atomic():
+                BookInstance.objects.bulk_create(copies)
+            self.stdout.write(f'{start + size} cópias')
+
+        # bulk_create não envia sinais: recalcula os dados derivados
+        counters.rebuild()
+        availability.refresh()
+        directory.rebuild()
+        object_cache.invalidate_all()
+        lookups.invalidate()
+        if not options['skip_search']:
+            search.rebuild_index()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["books"]} livros, {options["copies"]} cópias, {num_authors} autores e '
+            f'{options["users"]} usuários criados em {elapsed:.1f}s.'))
+
+    def _lookups(self, model, names):
+        existing = {name.lower() for name in model.objects.values_list('name', flat=True)}
+        model.objects.bulk_create(model(name=name) for name in names
+                                  if name.lower() not in existing)
+        return list(model.objects.values_list('pk', flat=True))
+
+    def _title(self, rng):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        return f'O {" e o ".join(words)}'.capitalize()[:200]
+
+    def _summary(self, rng):
+        return ' '.join(rng.choices(WORDS, k=rng.randint(20, 60))).capitalize() + '.'
@@ -0,0 +1,57 @@
+import datetime
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.core.management.base import BaseCommand
+
+from catalog.models import BookInstance
+
+
+class Command(BaseCommand):
+    help = ('Envia um aviso por solicitante com os livros atrasados, usando '
+            'uma única conexão de e-mail por lote.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Mensagens enviadas por conexão (padrão 500)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas mostra quantos avisos seriam enviados')
+
+    def handle(self, *args, **options):
+        today = datetime.date.today()
+        overdue = (
+            BookInstance.objects.overdue(today)
+            .filter(borrower__isnull=False)
+            .exclude(borrower__email='')
+            .select_related('book', 'borrower')
+            .order_by('borrower', 'due_back', 'id')
+            .iterator(chunk_size=2000)
+        )
+
+        sent = 0
+        batch = []
+        for borrower, copies in groupby(overdue, key=lambda copy: copy.borrower):
+            lines = [f'- {copy.book.title} (devolução em {copy.due_back:%d/%m/%Y})'
+                     for copy in copies]
+            body = (f'Olá {borrower.get_username()},\n\n'
+                    'Os seguintes livros estão com a devolução atrasada:\n\n'
+                    + '\n'.join(lines)
+                    + '\n\nPor favor, devolva-os ou renove o empréstimo.\n')
+            batch.append(('Biblioteca Local: livros atrasados', body,
+                          settings.DEFAULT_FROM_EMAIL, [borrower.email]))
+
+            if len(batch) >= options['batch_size']:
+                sent += self._send(batch, options['dry_run'])
+                batch = []
+        if batch:
+            sent += self._send(batch, options['dry_run'])
+
+        verb = 'seriam enviados' if options['dry_run'] else 'enviados'
+        self.stdout.write(self.style.SUCCESS(f'{sent} avisos {verb}.'))
+
+    def _send(self, messages, dry_run):
+        if dry_run:
+            return len(messages)
+        # send_mass_mail abre uma só conexão (EMAIL_BACKEND) p/ todo o lote
+        return send_mass_mail(messages, fail_silently=False)
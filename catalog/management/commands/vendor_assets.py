@@ -0,0 +1,30 @@
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import assets
+
+
+class Command(BaseCommand):
+    help = ('Baixa p/ catalog/static/ as bibliotecas de terceiros usadas pelas '
+            'páginas (catalog/assets.py), conferindo o hash de cada arquivo.  '
+            'Rode antes do collectstatic; depois o site não depende de CDN.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Baixa de novo mesmo os arquivos já presentes')
+        parser.add_argument('--timeout', type=float, default=30,
+                            help='Tempo máximo de cada download em segundos (padrão 30)')
+
+    def handle(self, *args, **options):
+        for name, asset in assets.VENDORED.items():
+            if assets.is_vendored(name) and not options['force']:
+                self.stdout.write(f'{asset.path}: já presente')
+                continue
+            try:
+                with urllib.request.urlopen(asset.url, timeout=options['timeout']) as response:
+                    content = response.read()
+                target = assets.save(name, content)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'{name}: {exc}')
+            self.stdout.write(self.style.SUCCESS(f'{target} ({len(content)} bytes)'))
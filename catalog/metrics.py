@@ -0,0 +1,320 @@
+"""Métricas por view: latência, consultas SQL e tempo de renderização.
+
+Cada processo acumula as métricas em memória (custo de um dicionário e um
+lock por requisição) e, a cada CATALOG_METRICS_FLUSH_INTERVAL segundos,
+grava uma cópia em CATALOG_METRICS_DIR/metrics-<pid>.json.  O endpoint
+/metrics soma os arquivos dos processos ainda vivos (os de processos
+encerrados são apagados) e responde no formato texto do Prometheus.
+"""
+import contextvars
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+# Limites (em segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Limites do histograma de consultas por requisição
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    'catalog_request_duration_seconds': ('Latência das requisições por view.', LATENCY_BUCKETS),
+    'catalog_request_db_queries': ('Consultas SQL por requisição.', QUERY_BUCKETS),
+}
+COUNTERS = {
+    'catalog_requests_total': 'Requisições por view e classe de status.',
+    'catalog_db_queries_total': 'Total de consultas SQL por view.',
+    'catalog_db_duration_seconds_total': 'Tempo total gasto na base de dados por view.',
+    'catalog_template_render_seconds_total': 'Tempo total de renderização de modelos por view.',
+    'catalog_object_cache_total': 'Acertos e falhas do cache de objetos das páginas de detalhe.',
+}
+
+# Estatísticas da requisição em andamento (tempo de modelo e de SQL)
+_current = contextvars.ContextVar('catalog_request_stats', default=None)
+
+
+def _label_key(labels):
+    return json.dumps(sorted(labels.items()))
+
+
+class Registry:
+    """Métricas acumuladas deste processo."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.counters = {name: {} for name in COUNTERS}
+        # Primeira gravação logo na primeira requisição: substitui o arquivo
+        #  de um processo encerrado que tinha o mesmo pid
+        self.last_flush = None
+
+    def observe(self, name, value, **labels):
+        buckets = HISTOGRAMS[name][1]
+        key = _label_key(labels)
+        with self.lock:
+            data = self.histograms[name].setdefault(
+                key, {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    data['buckets'][i] += 1
+            data['sum'] += value
+            data['count'] += 1
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.counters[name][key] = self.counters[name].get(key, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps({
+                'histograms': self.histograms, 'counters': self.counters}))
+
+    def flush(self, force=False):
+        """Grava a cópia deste processo no diretório compartilhado."""
+        directory = metrics_dir()
+        now = time.monotonic()
+        if directory is None or (not force and self.last_flush is not None
+                                 and now - self.last_flush < flush_interval()):
+            return
+        self.last_flush = now
+
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f'metrics-{os.getpid()}.json'
+        # Escrita atômica: quem lê nunca vê um arquivo pela metade
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        with os.fdopen(fd, 'w') as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(temporary, target)
+
+
+registry = Registry()
+
+
+def metrics_dir():
+    directory = getattr(settings, 'CATALOG_METRICS_DIR', None)
+    return Path(directory) if directory else None
+
+
+def flush_interval():
+    return getattr(settings, 'CATALOG_METRICS_FLUSH_INTERVAL', 5)
+
+
+def count(name, value=1, **labels):
+    """Incrementa um contador registrado em COUNTERS (uso por outros módulos)."""
+    registry.inc(name, value, **labels)
+
+
+def _stale(path, pid):
+    """A cópia em 'path' é de um processo que já terminou?"""
+    if os.name != 'posix':
+        # Sem os.kill(pid, 0) como simples verificação (Windows): vale a idade
+        #  do arquivo
+        try:
+            return time.time() - path.stat().st_mtime > 10 * flush_interval()
+        except OSError:
+            return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        # Existe, mas é de outro usuário
+        return False
+    return False
+
+
+def collect():
+    """Soma as métricas dos processos vivos (incluindo este).  Cópias de
+       processos encerrados (reinício, reciclagem de workers) são apagadas:
+       os totais não crescem a cada reinício."""
+    snapshots = [registry.snapshot()]
+    directory = metrics_dir()
+    if directory is not None and directory.is_dir():
+        for path in directory.glob('metrics-*.json'):
+            match = re.fullmatch(r'metrics-(\d+)\.json', path.name)
+            if match is None or int(match.group(1)) == os.getpid():
+                continue
+            if _stale(path, int(match.group(1))):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+
+    merged = {'histograms': {name: {} for name in HISTOGRAMS},
+              'counters': {name: {} for name in COUNTERS}}
+    for snapshot in snapshots:
+        for name, series in snapshot.get('histograms', {}).items():
+            for key, data in series.items():
+                if name not in merged['histograms']:
+                    continue
+                total = merged['histograms'][name].setdefault(
+                    key, {'buckets': [0] * len(data['buckets']), 'sum': 0.0, 'count': 0})
+                total['buckets'] = [a + b for a, b in zip(total['buckets'], data['buckets'])]
+                total['sum'] += data['sum']
+                total['count'] += data['count']
+        for name, series in snapshot.get('counters', {}).items():
+            if name not in merged['counters']:
+                continue
+            for key, value in series.items():
+                merged['counters'][name][key] = merged['counters'][name].get(key, 0) + value
+    return merged
+
+
+def _labels(key, **extra):
+    pairs = json.loads(key) + sorted(extra.items())
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def render_prometheus(merged=None):
+    """Texto no formato de exposição do Prometheus."""
+    merged = merged or collect()
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for key, data in sorted(merged['histograms'][name].items()):
+            for bound, value in zip(buckets, data['buckets']):
+                lines.append(f'{name}_bucket{_labels(key, le=bound)} {value}')
+            lines.append(f'{name}_bucket{_labels(key, le="+Inf")} {data["count"]}')
+            lines.append(f'{name}_sum{_labels(key)} {data["sum"]}')
+            lines.append(f'{name}_count{_labels(key)} {data["count"]}')
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for key, value in sorted(merged['counters'][name].items()):
+            lines.append(f'{name}{_labels(key)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'template_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+
+def _execute(execute, sql, params, many, context):
+    """Envolve cada consulta SQL e a soma à requisição em andamento.
+
+       Fica instalado em todas as conexões: a requisição é encontrada pela
+       contextvar, o que funciona também com o ORM assíncrono (consultas
+       executadas em outra thread) e com requisições concorrentes."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+def install(connection):
+    # No início da lista: execute_wrapper() remove sempre o último item
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _execute)
+
+
+@receiver(connection_created)
+def _connection_created(sender, connection, **kwargs):
+    install(connection)
+
+
+class MetricsMiddleware:
+    """Registra latência, consultas e tempo de modelo por nome de URL.
+
+       Funciona tanto em WSGI quanto em ASGI (sem adaptar a pilha)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Conexões abertas antes deste módulo ser carregado
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed, stats):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or 'unmatched'
+
+        registry.observe('catalog_request_duration_seconds', elapsed, view=view)
+        registry.observe('catalog_request_db_queries', stats.queries, view=view)
+        registry.inc('catalog_requests_total', view=view,
+                     status=f'{response.status_code // 100}xx')
+        registry.inc('catalog_db_queries_total', stats.queries, view=view)
+        registry.inc('catalog_db_duration_seconds_total', stats.db_time, view=view)
+        registry.inc('catalog_template_render_seconds_total', stats.template_time, view=view)
+        registry.flush()
+
+
+class InstrumentedTemplate(Template):
+    """Modelo que soma seu tempo de renderização à requisição atual."""
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Backend DjangoTemplates que mede o tempo de renderização."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
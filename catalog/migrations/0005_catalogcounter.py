@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:51
+
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    """Preenche os contadores com os totais já existentes na base."""
+    CatalogCounter = apps.get_model('catalog', 'CatalogCounter')
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+    Author = apps.get_model('catalog', 'Author')
+
+    values = {
+        'books': Book.objects.count(),
+        'instances': BookInstance.objects.count(),
+        'instances_available': BookInstance.objects.filter(status='d').count(),
+        'authors': Author.objects.count(),
+    }
+    CatalogCounter.objects.bulk_create(
+        CatalogCounter(name=name, value=value) for name, value in values.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_alter_bookinstance_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def create_fts(apps, schema_editor):
+    """Cria a tabela FTS5 da busca e indexa os livros existentes (SQLite)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_book_fts USING fts5("
+        "title, summary, author, genre, language, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO catalog_book_fts (rowid, title, summary, author, genre, language) "
+        "SELECT b.id, b.title, b.summary, "
+        "COALESCE(a.first_name || ' ' || a.last_name, ''), "
+        "COALESCE((SELECT GROUP_CONCAT(g.name, ' ') FROM catalog_book_genre bg "
+        "JOIN catalog_genre g ON g.id = bg.genre_id WHERE bg.book_id = b.id), ''), "
+        "COALESCE(l.name, '') "
+        "FROM catalog_book b "
+        "LEFT JOIN catalog_author a ON a.id = b.author_id "
+        "LEFT JOIN catalog_language l ON l.id = b.language_id"
+    )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS catalog_book_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_catalogcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
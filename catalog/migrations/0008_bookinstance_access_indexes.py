@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:57
+
+from django.db import migrations, models
+
+import catalog.operations
+
+
+class Migration(migrations.Migration):
+
+    # Índices criados sem transação (CONCURRENTLY no PostgreSQL), p/ não
+    #  bloquear a tabela de cópias durante a migração
+    atomic = False
+
+    dependencies = [
+        ('catalog', '0007_bookinstance_status_due_idx'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='bookinstance',
+            options={'permissions': (('can_mark_returned', 'Marcar livro como devolvido'),)},
+        ),
+        catalog.operations.AddIndexSafely(
+            model_name='book',
+            index=models.Index(fields=['title', 'id'], name='book_title_idx'),
+        ),
+        catalog.operations.AddIndexSafely(
+            model_name='bookinstance',
+            index=models.Index(fields=['borrower', 'status', 'due_back'], name='bookinst_borrower_due_idx'),
+        ),
+        catalog.operations.AddIndexSafely(
+            model_name='bookinstance',
+            index=models.Index(condition=models.Q(('status', 'e')), fields=['due_back'], name='bookinst_loan_due_idx'),
+        ),
+        migrations.RunPython(catalog.operations.analyze, migrations.RunPython.noop),
+    ]
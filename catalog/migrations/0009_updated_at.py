@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:05
+
+from django.db import migrations, models
+
+import catalog.operations
+
+
+class Migration(migrations.Migration):
+
+    # Índices criados sem bloquear escritas (ver 0008)
+    atomic = False
+
+    dependencies = [
+        ('catalog', '0008_bookinstance_access_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Atualizado em'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Atualizado em'),
+        ),
+        migrations.AddField(
+            model_name='bookinstance',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Atualizado em'),
+        ),
+        catalog.operations.AddIndexSafely(
+            model_name='author',
+            index=models.Index(fields=['updated_at'], name='author_updated_idx'),
+        ),
+        catalog.operations.AddIndexSafely(
+            model_name='book',
+            index=models.Index(fields=['updated_at'], name='book_updated_idx'),
+        ),
+    ]
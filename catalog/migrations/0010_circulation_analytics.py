@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AggregationCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CirculationDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('dimension', models.CharField(choices=[('all', 'Total'), ('genre', 'Gênero'), ('language', 'Idioma'), ('borrower', 'Solicitante'), ('copy', 'Cópia')], max_length=10)),
+                ('key', models.CharField(blank=True, max_length=36)),
+                ('loans', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+                ('renewals', models.PositiveIntegerField(default=0)),
+                ('loan_days', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CirculationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Ocorrido em')),
+                ('kind', models.CharField(choices=[('loan', 'Empréstimo'), ('return', 'Devolução'), ('renewal', 'Renovação'), ('reserve', 'Reserva'), ('change', 'Outra mudança')], max_length=10)),
+                ('copy_id', models.UUIDField(verbose_name='Cópia')),
+                ('book_id', models.BigIntegerField(null=True, verbose_name='Livro')),
+                ('borrower_id', models.BigIntegerField(null=True, verbose_name='Solicitante')),
+                ('status_from', models.CharField(blank=True, max_length=1)),
+                ('status_to', models.CharField(blank=True, max_length=1)),
+                ('due_back', models.DateField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['copy_id', 'kind', 'id'], name='circ_event_copy_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='circulationdaily',
+            constraint=models.UniqueConstraint(fields=('dimension', 'day', 'key'), name='circ_daily_unique'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+import catalog.operations
+
+
+def fill_counters(apps, schema_editor):
+    """Contadores iniciais a partir das cópias, num único UPDATE."""
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+
+    def count(**filters):
+        copies = (BookInstance.objects.filter(book=OuterRef('pk'), **filters)
+                  .order_by().values('book').annotate(n=Count('pk')).values('n'))
+        return Coalesce(Subquery(copies), 0)
+
+    Book.objects.update(copies_total=count(), copies_available=count(status='d'),
+                        copies_on_loan=count(status='e'))
+
+
+class Migration(migrations.Migration):
+
+    # Índices criados sem bloquear escritas (ver 0008)
+    atomic = False
+
+    dependencies = [
+        ('catalog', '0010_circulation_analytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copies_available',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Disponíveis'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_on_loan',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Emprestadas'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_total',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Cópias'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        catalog.operations.AddIndexSafely(
+            model_name='book',
+            index=models.Index(fields=['-copies_available', 'title', 'id'], name='book_available_idx'),
+        ),
+        catalog.operations.AddIndexSafely(
+            model_name='book',
+            index=models.Index(condition=models.Q(('copies_available__gt', 0)), fields=['title', 'id'], name='book_in_stock_title_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:33
+
+from django.db import migrations, models
+
+import catalog.operations
+
+
+def fill_letters(apps, schema_editor):
+    """Índice A–Z inicial, numa leitura ordenada dos autores (mesma regra
+       de catalog.directory.letter)."""
+    Author = apps.get_model('catalog', 'Author')
+    AuthorLetter = apps.get_model('catalog', 'AuthorLetter')
+
+    entries = {}
+    for pk, first_name, last_name in (Author.objects.order_by('last_name', 'first_name', 'id')
+                                      .values_list('pk', 'first_name', 'last_name').iterator()):
+        initial = last_name[:1].upper()[:1] or '#'
+        if initial in entries:
+            entries[initial].count += 1
+        else:
+            entries[initial] = AuthorLetter(letter=initial, count=1, first_last_name=last_name,
+                                            first_first_name=first_name, first_id=pk)
+    AuthorLetter.objects.bulk_create(entries.values())
+
+
+class Migration(migrations.Migration):
+
+    # Índice criado sem bloquear escritas (ver 0008)
+    atomic = False
+
+    dependencies = [
+        ('catalog', '0011_book_availability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorLetter',
+            fields=[
+                ('letter', models.CharField(max_length=1, primary_key=True, serialize=False)),
+                ('count', models.IntegerField(default=0)),
+                ('first_last_name', models.CharField(max_length=100)),
+                ('first_first_name', models.CharField(max_length=100)),
+                ('first_id', models.BigIntegerField()),
+            ],
+            options={
+                'ordering': ['letter'],
+            },
+        ),
+        migrations.RunPython(fill_letters, migrations.RunPython.noop),
+        catalog.operations.AddIndexSafely(
+            model_name='author',
+            index=models.Index(fields=['last_name', 'first_name'], name='author_name_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+import catalog.operations
+
+BATCH_SIZE = 1000
+
+
+def fill_name_keys(apps, schema_editor):
+    """Chave de nome dos autores existentes (mesma regra de
+       Author.name_key_for), em lotes."""
+    Author = apps.get_model('catalog', 'Author')
+
+    batch = []
+    for author in Author.objects.only('pk', 'first_name', 'last_name').iterator():
+        author.name_key = f'{author.last_name.lower()}\t{author.first_name.lower()}'
+        batch.append(author)
+        if len(batch) >= BATCH_SIZE:
+            Author.objects.bulk_update(batch, ['name_key'])
+            batch = []
+    Author.objects.bulk_update(batch, ['name_key'])
+
+
+class Migration(migrations.Migration):
+
+    # Índice criado sem bloquear escritas (ver 0008)
+    atomic = False
+
+    dependencies = [
+        ('catalog', '0012_author_directory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=201),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+        catalog.operations.AddIndexSafely(
+            model_name='author',
+            index=models.Index(fields=['name_key'], name='author_name_key_idx'),
+        ),
+    ]
@@ -3,10 +3,32 @@ from django.db.models import UniqueConstraint # P/ valores únicos
 from django.db.models.functions import Lower # Ret. letras minúsculas de um campo
 from django.urls import reverse # get_absolute_url() recolhe URL de um ID
 from django.conf import settings
+from django.utils import timezone
 from django.contrib.auth.models import User
 from datetime import date
 import uuid # Necessário para instância de livros
 
+class LoadedValuesMixin:
+    """Guarda os valores lidos da base em '_loaded_values' p/ detectar
+       mudanças ao salvar (ex.: situação do empréstimo nos contadores)."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if value is not models.DEFERRED
+        }
+        return instance
+
+    def remember_loaded_values(self):
+        """Marca o estado atual (recém salvo) como o estado da base."""
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
+
+
 class Genre(models.Model):
     """Gênero de um livro."""
     name = models.CharField(
@@ -34,7 +56,7 @@ class Genre(models.Model):
             ),
         ]
 
-class Book(models.Model):
+class Book(LoadedValuesMixin, models.Model):
     """Entidade livro, não uma cópia/instância."""
     title = models.CharField(max_length = 200)
     
@@ -57,6 +79,16 @@ class Book(models.Model):
     language = models.ForeignKey(
         'Language', on_delete=models.SET_NULL, null=True)
 
+    # Última alteração (validador das respostas condicionais, ver
+    #  catalog/conditional.py).  Mudanças em gêneros, idioma e cópias
+    #  removidas também atualizam esse campo (catalog/signals.py)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    # Disponibilidade, mantida a cada mudança nas cópias (catalog/availability.py)
+    copies_total = models.IntegerField('Cópias', default=0, editable=False)
+    copies_available = models.IntegerField('Disponíveis', default=0, editable=False)
+    copies_on_loan = models.IntegerField('Emprestadas', default=0, editable=False)
+
     def __str__(self):
         """Retorna o título do livro"""
         return self.title
@@ -68,12 +100,44 @@ class Book(models.Model):
     def display_genre(self):
         """Retorna texto mostrando os três primeiros gêneros para o painel Adm.
            Necessário para campos tipo muitos para muitos na base de dados"""
-        return ', '.join(genre.name for genre in self.genre.all()[:3])
+        # catalog.lookups importa os modelos: importado aqui
+        from . import lookups
+
+        # Página inteira já preenchida por lookups.attach() (ex.: admin)
+        if not hasattr(self, 'genre_list'):
+            lookups.attach([self], language=False)
+        return ', '.join(genre.name for genre in self.genre_list[:3])
 
     # Nome da coluna no painel Adm dessa classe
     display_genre.short_description = 'Genre'
+
+    class Meta:
+        indexes = [
+            # Listagem ordenada por título (e paginação por (title, id))
+            models.Index(fields=['title', 'id'], name='book_title_idx'),
+            # Alteração mais recente do catálogo (validador da listagem)
+            models.Index(fields=['updated_at'], name='book_updated_idx'),
+            # Listagem ordenada pela disponibilidade (-copies_available, title, id)
+            models.Index(fields=['-copies_available', 'title', 'id'], name='book_available_idx'),
+            # Apenas livros com cópias disponíveis, por título
+            models.Index(fields=['title', 'id'], condition=models.Q(copies_available__gt=0),
+                         name='book_in_stock_title_idx'),
+        ]
     
-class BookInstance(models.Model):
+class BookInstanceQuerySet(models.QuerySet):
+    """Consultas de empréstimo resolvidas na base (não em Python)."""
+
+    def on_loan(self):
+        """Cópias emprestadas."""
+        return self.filter(status__exact='e')
+
+    def overdue(self, today=None):
+        """Cópias emprestadas com devolução vencida; usa o índice
+           (status, due_back)."""
+        return self.on_loan().filter(due_back__lt=today or date.today())
+
+
+class BookInstance(LoadedValuesMixin, models.Model):
     """Manifestação física de um livro"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4,
                           help_text="Identificador único para esse " \
@@ -102,9 +166,14 @@ class BookInstance(models.Model):
                                  on_delete=models.SET_NULL,
                                  null=True, blank=True)
 
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    objects = BookInstanceQuerySet.as_manager()
+
     @property
     def is_overdue(self):
-        """Determina se um livro esta atrasado com base no dia atual."""
+        """Determina se um livro esta atrasado com base no dia atual.
+           P/ buscar atrasados use BookInstance.objects.overdue()."""
         # Necessário validar se a data de retorno existe
         return bool(self.due_back and date.today() > self.due_back)
 
@@ -138,8 +207,19 @@ class BookInstance(models.Model):
     #     return '-'
 
     class Meta:
-        ordering = ['due_back']
+        # Sem 'ordering' padrão: cada consulta ordena explicitamente, evitando
+        #  um ORDER BY due_back (e uma ordenação temporária) em toda consulta
         permissions = (("can_mark_returned", "Marcar livro como devolvido"),)
+        indexes = [
+            # Empréstimos/atrasados: status = 'e' AND due_back < hoje
+            models.Index(fields=['status', 'due_back'], name='bookinst_status_due_idx'),
+            # Empréstimos de um usuário ordenados pela devolução
+            models.Index(fields=['borrower', 'status', 'due_back'],
+                         name='bookinst_borrower_due_idx'),
+            # Índice parcial: apenas as cópias emprestadas, por devolução
+            models.Index(fields=['due_back'], condition=models.Q(status='e'),
+                         name='bookinst_loan_due_idx'),
+        ]
 
     def __str__(self):
         """Texto que representa a instância"""
@@ -148,15 +228,37 @@ class BookInstance(models.Model):
     #display_expected_return.short_description = 'Devolução'
             
 
-class Author(models.Model):
+class Author(LoadedValuesMixin, models.Model):
     """Modelo que representa o autor"""
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     date_of_birth = models.DateField(null=True, blank=True)
     date_of_death = models.DateField('Died', null=True, blank=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    # Sobrenome e nome em minúsculas (ver name_key_for()), p/ achar um autor
+    #  pelo nome sem distinção de maiúsculas usando um índice (importação)
+    name_key = models.CharField(max_length=201, editable=False, default='')
 
     class Meta:
         ordering = ['last_name', 'first_name']
+        indexes = [
+            models.Index(fields=['updated_at'], name='author_updated_idx'),
+            # Listagem paginada por busca em (last_name, first_name, id)
+            models.Index(fields=['last_name', 'first_name'], name='author_name_idx'),
+            models.Index(fields=['name_key'], name='author_name_key_idx'),
+        ]
+
+    @staticmethod
+    def name_key_for(first_name, last_name):
+        # str.lower() e não LOWER() da base: o do SQLite só conhece ASCII
+        return f'{last_name.lower()}\t{first_name.lower()}'
+
+    def save(self, *args, **kwargs):
+        self.name_key = self.name_key_for(self.first_name, self.last_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'first_name', 'last_name'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         """Retorna a URL para acessar os detalhes desse autor"""
@@ -166,6 +268,23 @@ class Author(models.Model):
         """Texto que representa o modelo objeto"""
         return f'{self.last_name}, {self.first_name}'
 
+
+class AuthorLetter(models.Model):
+    """Índice A–Z da listagem de autores: nº de autores por inicial do
+       sobrenome e o primeiro deles na ordem da listagem (ver
+       catalog/directory.py)."""
+    letter = models.CharField(max_length=1, primary_key=True)
+    count = models.IntegerField(default=0)
+    first_last_name = models.CharField(max_length=100)
+    first_first_name = models.CharField(max_length=100)
+    first_id = models.BigIntegerField()
+
+    class Meta:
+        ordering = ['letter']
+
+    def __str__(self):
+        return f'{self.letter}: {self.count}'
+
 class Language(models.Model):
     """Modelo que representa um idioma"""
     name = models.CharField(max_length=200,
@@ -189,3 +308,102 @@ class Language(models.Model):
                 "distinção entre maiúscula e minúsculas)"
                 ),
             ]
+
+
+class CatalogCounter(models.Model):
+    """Contador materializado do catálogo (ex.: total de livros).
+
+       Mantido pelos sinais em catalog/signals.py e reconstruído pelo
+       comando 'rebuild_counters'.  Permite à tela inicial ler todos os
+       totais numa única consulta, sem COUNT(*) sobre as tabelas."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+
+class CirculationEvent(models.Model):
+    """Registro (somente inclusão) de cada mudança de situação, solicitante
+       ou devolução prevista de uma cópia (ver catalog/analytics.py).
+
+       Guarda os ids, não chaves estrangeiras: o histórico sobrevive à
+       remoção da cópia, do livro ou do usuário."""
+    LOAN = 'loan'
+    RETURN = 'return'
+    RENEWAL = 'renewal'
+    RESERVE = 'reserve'
+    CHANGE = 'change'
+    KINDS = (
+        (LOAN, 'Empréstimo'),
+        (RETURN, 'Devolução'),
+        (RENEWAL, 'Renovação'),
+        (RESERVE, 'Reserva'),
+        (CHANGE, 'Outra mudança'),
+    )
+
+    occurred_at = models.DateTimeField('Ocorrido em', default=timezone.now)
+    kind = models.CharField(max_length=10, choices=KINDS)
+    copy_id = models.UUIDField('Cópia')
+    book_id = models.BigIntegerField('Livro', null=True)
+    # Solicitante do empréstimo (o novo, num empréstimo; o anterior, numa devolução)
+    borrower_id = models.BigIntegerField('Solicitante', null=True)
+    status_from = models.CharField(max_length=1, blank=True)
+    status_to = models.CharField(max_length=1, blank=True)
+    due_back = models.DateField(null=True)
+
+    class Meta:
+        indexes = [
+            # Início do empréstimo de uma cópia (duração na devolução)
+            models.Index(fields=['copy_id', 'kind', 'id'], name='circ_event_copy_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.occurred_at:%Y-%m-%d %H:%M} {self.get_kind_display()} {self.copy_id}'
+
+
+class CirculationDaily(models.Model):
+    """Totais de circulação de um dia, por dimensão (total, gênero, idioma,
+       solicitante ou cópia).  Preenchido de forma incremental pelo comando
+       'aggregate_circulation'; os relatórios leem apenas esta tabela."""
+    ALL = 'all'
+    GENRE = 'genre'
+    LANGUAGE = 'language'
+    BORROWER = 'borrower'
+    COPY = 'copy'
+    DIMENSIONS = (
+        (ALL, 'Total'),
+        (GENRE, 'Gênero'),
+        (LANGUAGE, 'Idioma'),
+        (BORROWER, 'Solicitante'),
+        (COPY, 'Cópia'),
+    )
+
+    day = models.DateField()
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS)
+    # Id do gênero, idioma, solicitante ou cópia ('' no total)
+    key = models.CharField(max_length=36, blank=True)
+    loans = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    renewals = models.PositiveIntegerField(default=0)
+    # Dias de empréstimo encerrados (devolvidos) no dia
+    loan_days = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Também o índice dos relatórios: dimensão + intervalo de datas
+            UniqueConstraint(fields=['dimension', 'day', 'key'], name='circ_daily_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.dimension} {self.key}: {self.loans}'
+
+
+class AggregationCheckpoint(models.Model):
+    """Último evento já somado por uma agregação incremental."""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.last_id}'
@@ -0,0 +1,117 @@
+"""Cache versionado dos objetos exibidos nas páginas de detalhe.
+
+Cada objeto (ex.: livro 42) tem uma chave de versão no cache.  O conteúdo
+fica sob uma chave que inclui essa versão, então invalidar é apenas trocar
+a versão: as entradas antigas deixam de ser lidas e expiram sozinhas.  As
+versões são trocadas pelos sinais em catalog/signals.py.
+
+Funciona com qualquer backend de cache do Django; com FileBasedCache (ver
+CATALOG_CACHE_DIR) a invalidação vale p/ todos os processos.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+
+# Geração global: trocada p/ invalidar tudo de uma vez (ex.: seed_library)
+GENERATION_KEY = 'catalog:objects:generation'
+
+
+class Stats:
+    """Acertos e falhas do cache neste processo."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, kind, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.count('catalog_object_cache_total', kind=kind,
+                      result='hit' if hit else 'miss')
+
+
+stats = Stats()
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_OBJECT_CACHE_TIMEOUT', 60 * 60)
+
+
+def _version_key(kind, pk):
+    return f'catalog:{kind}:{pk}:version'
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def _keys(kind, pk, current):
+    """(chave do conteúdo, nova versão a gravar ou None) a partir da
+       leitura da geração e da versão do objeto."""
+    generation = current.get(GENERATION_KEY, 0)
+    version = current.get(_version_key(kind, pk))
+    # Versão inédita (ou expulsa do cache): nunca reaproveita conteúdo antigo
+    new_version = _new_version() if version is None else None
+    return f'catalog:{kind}:{pk}:{generation}:{version or new_version}', new_version
+
+
+def get_or_build(kind, pk, builder):
+    """Retorna o objeto 'kind' 'pk' do cache ou o constrói com builder()."""
+    key, new_version = _keys(kind, pk, cache.get_many([GENERATION_KEY, _version_key(kind, pk)]))
+    if new_version is None:
+        value = cache.get(key)
+        if value is not None:
+            stats.record(kind, hit=True)
+            return value
+    else:
+        cache.set(_version_key(kind, pk), new_version, None)
+
+    stats.record(kind, hit=False)
+    value = builder()
+    cache.set(key, value, _timeout())
+    return value
+
+
+async def aget_or_build(kind, pk, builder):
+    """get_or_build() p/ views assíncronas; builder é uma corrotina."""
+    key, new_version = _keys(kind, pk, await cache.aget_many([GENERATION_KEY,
+                                                              _version_key(kind, pk)]))
+    if new_version is None:
+        value = await cache.aget(key)
+        if value is not None:
+            stats.record(kind, hit=True)
+            return value
+    else:
+        await cache.aset(_version_key(kind, pk), new_version, None)
+
+    stats.record(kind, hit=False)
+    value = await builder()
+    await cache.aset(key, value, _timeout())
+    return value
+
+
+def _bump(kind, pks):
+    version = _new_version()
+    cache.set_many({_version_key(kind, pk): version for pk in pks}, None)
+
+
+def invalidate(kind, pks):
+    """Troca a versão dos objetos indicados, agora e de novo após o commit
+       (uma leitura concorrente pode ter guardado o estado anterior)."""
+    pks = {pk for pk in pks if pk is not None}
+    if pks:
+        _bump(kind, pks)
+        transaction.on_commit(lambda: _bump(kind, pks))
+
+
+def invalidate_all():
+    cache.set(GENERATION_KEY, _new_version(), None)
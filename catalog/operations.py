@@ -0,0 +1,36 @@
+"""Operações de migração seguras p/ tabelas grandes."""
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexSafely(AddIndex):
+    """AddIndex que não bloqueia escritas enquanto o índice é criado.
+
+       No PostgreSQL usa CREATE INDEX CONCURRENTLY (a migração precisa de
+       'atomic = False'); nas demais bases equivale a AddIndex."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
+
+    def describe(self):
+        return super().describe() + ' (sem bloquear escritas)'
+
+
+def analyze(apps, schema_editor):
+    """Atualiza as estatísticas do planejador após criar índices."""
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('ANALYZE')
@@ -0,0 +1,296 @@
+"""Paginação por busca (keyset) p/ listagens grandes do catálogo.
+
+Em vez de OFFSET/LIMIT, cada página continua a partir da chave de ordenação
+do último registro da página anterior, ex.: (due_back, id).  O custo de
+qualquer página é o mesmo, seja a primeira ou a milésima.  A posição vai
+na URL como um cursor opaco (?cursor=...).
+
+Também traz o EstimatedCountPaginator, usado pelo admin em tabelas grandes.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values, backwards=False):
+    """Gera o token opaco p/ os valores da chave de ordenação."""
+    payload = json.dumps({'k': values, 'b': backwards},
+                         cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Retorna (valores, para_trás) de um token gerado por encode_cursor."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return list(payload['k']), bool(payload['b'])
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(token)
+
+
+def keyset_enabled():
+    return getattr(settings, 'CATALOG_KEYSET_PAGINATION', False)
+
+
+def keyset_with_count():
+    return getattr(settings, 'CATALOG_PAGINATION_COUNT', True)
+
+
+class KeysetPage:
+    """Página de uma KeysetPaginator, com a interface usada nos modelos."""
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """Pagina 'queryset' pela chave 'ordering' (ex.: ('title', 'id')).
+
+       O último campo da chave deve ser único (normalmente 'id').  Campos
+       com '-' são decrescentes.  Nulos vêm primeiro em ordem crescente
+       (e por último na decrescente) em qualquer base de dados.  Com
+       'with_count' falso o COUNT(*) total nunca é executado; 'count' é o
+       total já conhecido (ex.: de um contador), usado no lugar do COUNT(*)."""
+
+    def __init__(self, queryset, per_page, ordering, with_count=True, count=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.with_count = with_count
+        if with_count and count is not None:
+            self.count = count
+        self.keys = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        opts = queryset.model._meta
+        self.attnames = [opts.get_field(name).attname for name, _ in self.keys]
+
+    @cached_property
+    def count(self):
+        if not self.with_count:
+            return None
+        return self.queryset.count()
+
+    @cached_property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, -(-self.count // self.per_page))
+
+    def _order_by(self, backwards):
+        order = []
+        for name, desc in self.keys:
+            # Percorrer p/ trás inverte o sentido (e a posição dos nulos)
+            if desc != backwards:
+                order.append(F(name).desc(nulls_last=True))
+            else:
+                order.append(F(name).asc(nulls_first=True))
+        return order
+
+    def seek_filter(self, values, backwards):
+        """Filtro que seleciona os registros após (ou antes) da chave."""
+        condition = None
+        for (name, desc), value in reversed(list(zip(self.keys, values))):
+            descending = desc != backwards
+            if value is None:
+                after = None if descending else Q(**{f'{name}__isnull': False})
+                equal = Q(**{f'{name}__isnull': True})
+            elif descending:
+                after = Q(**{f'{name}__lt': value}) | Q(**{f'{name}__isnull': True})
+                equal = Q(**{name: value})
+            else:
+                after = Q(**{f'{name}__gt': value})
+                equal = Q(**{name: value})
+
+            # (campo depois do valor) OU (campo igual E resto da chave depois)
+            parts = [part for part in (
+                after, equal & condition if condition is not None else None)
+                if part is not None]
+            if not parts:
+                return None
+            condition = parts[0]
+            for part in parts[1:]:
+                condition |= part
+        return condition
+
+    def _key(self, obj):
+        # Objetos do modelo ou linhas de values() (dicionários)
+        if isinstance(obj, dict):
+            return [obj[attname] for attname in self.attnames]
+        return [getattr(obj, attname) for attname in self.attnames]
+
+    def _seek(self, cursor):
+        """(consulta da página, valores do cursor, para_trás)."""
+        values, backwards = None, False
+        if cursor:
+            try:
+                values, backwards = decode_cursor(cursor)
+            except InvalidCursor:
+                values = None
+            if values is not None and len(values) != len(self.keys):
+                values, backwards = None, False
+
+        queryset = self.queryset.order_by(*self._order_by(backwards))
+        if values is not None:
+            condition = self.seek_filter(values, backwards)
+            queryset = queryset.filter(condition) if condition is not None else queryset.none()
+        return queryset[:self.per_page + 1], values, backwards
+
+    def _page(self, rows, values, backwards):
+        """KeysetPage com as linhas lidas (uma a mais que a página), ou
+           None quando a volta chegou ao início."""
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            if not has_more:
+                return None
+            rows.reverse()
+            has_next, has_previous = True, True
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return KeysetPage(
+            rows, self, has_next, has_previous,
+            next_cursor=encode_cursor(self._key(rows[-1])) if has_next and rows else None,
+            previous_cursor=encode_cursor(self._key(rows[0]), backwards=True)
+            if has_previous and rows else None,
+        )
+
+    def get_page(self, cursor=None):
+        """Página após/antes do cursor; cursor inválido volta ao início."""
+        queryset, values, backwards = self._seek(cursor)
+        page = self._page(list(queryset), values, backwards)
+        # Chegou ao início: mostra a primeira página completa
+        return page if page is not None else self.get_page()
+
+    async def aget_page(self, cursor=None):
+        """get_page() com o ORM assíncrono (inclusive o total, se pedido)."""
+        if self.with_count and 'count' not in self.__dict__:
+            self.count = await self.queryset.acount()
+        queryset, values, backwards = self._seek(cursor)
+        page = self._page([obj async for obj in queryset], values, backwards)
+        return page if page is not None else await self.aget_page()
+
+
+class KeysetPaginationMixin:
+    """Usa KeysetPaginator em ListView quando CATALOG_KEYSET_PAGINATION
+       está ativo (ou sempre, com 'keyset_only'); caso contrário mantém a
+       paginação padrão do Django."""
+    keyset_ordering = None
+    keyset_only = False
+
+    def get_keyset_count(self):
+        """Total da listagem, se já conhecido (evita o COUNT(*))."""
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        if not (self.keyset_only or keyset_enabled()):
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering,
+                                    with_count=keyset_with_count(),
+                                    count=self.get_keyset_count())
+        page = paginator.get_page(self.request.GET.get('cursor'))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+def estimate_count(queryset):
+    """Estimativa barata do total de linhas de uma tabela sem filtros.
+
+       Usa as estatísticas da base no PostgreSQL (pg_class) e o maior rowid
+       no SQLite.  Retorna None quando a consulta tem filtros ou a base não
+       oferece estimativa."""
+    if queryset.query.where or queryset.query.distinct:
+        return None
+
+    table = queryset.model._meta.db_table
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                           [table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+
+        if connection.vendor == 'sqlite':
+            # Maior rowid: busca na árvore, sem varrer a tabela.  Superestima
+            #  apenas quando há linhas removidas no meio da tabela
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+            row = cursor.fetchone()
+            return row[0] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator p/ o admin que evita COUNT(*) exato em tabelas grandes.
+
+       Abaixo de 'exact_threshold' linhas (ou com filtros aplicados) conta
+       normalmente; acima disso usa a estimativa de estimate_count()."""
+    exact_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_threshold:
+            return super().count
+        return estimate
+
+
+def paginate(request, queryset, per_page, keyset_ordering):
+    """Equivalente de KeysetPaginationMixin p/ views em forma de função."""
+    if keyset_enabled():
+        paginator = KeysetPaginator(queryset, per_page, keyset_ordering,
+                                    with_count=keyset_with_count())
+        return paginator.get_page(request.GET.get('cursor'))
+
+    return Paginator(queryset, per_page).get_page(request.GET.get('page'))
+
+
+async def apaginate(request, queryset, per_page, keyset_ordering, keyset_only=False,
+                    count=None):
+    """paginate() p/ views assíncronas: a página já vem lida da base.
+       'keyset_only' e 'count' como em KeysetPaginationMixin."""
+    if keyset_only or keyset_enabled():
+        paginator = KeysetPaginator(queryset, per_page, keyset_ordering,
+                                    with_count=keyset_with_count(), count=count)
+        return await paginator.aget_page(request.GET.get('cursor'))
+
+    paginator = Paginator(queryset, per_page)
+    # Total lido antes: Paginator.get_page() não faz mais consultas
+    paginator.count = await queryset.acount()
+    page = paginator.get_page(request.GET.get('page'))
+    page.object_list = [obj async for obj in page.object_list]
+    return page
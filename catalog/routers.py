@@ -0,0 +1,166 @@
+"""Leituras de listagens e relatórios na réplica ('replica') da base.
+
+Por padrão tudo é lido e gravado no primário ('default').  Páginas de
+listagem e relatório (e as listagens do admin) leem da réplica com o
+decorator @replica_reads ou com 'with replica():'.  Gravações vão sempre ao
+primário, e as leituras voltam a ele:
+
+- no restante da requisição, depois de qualquer gravação;
+- por CATALOG_REPLICA_STICKY_SECONDS segundos depois de uma requisição
+  POST (ou outro método não seguro) que gravou, no mesmo navegador (cookie):
+  quem acabou de renovar um empréstimo vê a própria mudança mesmo com a
+  réplica atrasada.
+
+Só os modelos do catálogo são lidos da réplica; sessões e usuários ficam
+no primário.  Uma réplica que aponta p/ a mesma base do primário (espelho
+dos testes, TEST['MIRROR']) é lida pela própria conexão do primário.
+"""
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY = DEFAULT_DB_ALIAS
+REPLICA = 'replica'
+REPLICA_APPS = {'catalog'}
+STICKY_COOKIE = 'catalog_primary'
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS', 'TRACE'}
+
+# Leituras liberadas p/ a réplica no contexto atual
+_replica = contextvars.ContextVar('catalog_replica_reads', default=False)
+# Estado da requisição atual (ReplicaMiddleware)
+_request = contextvars.ContextVar('catalog_db_request', default=None)
+
+
+class RequestRouting:
+    """Gravações da requisição e se ela deve ler do primário."""
+
+    def __init__(self, sticky=False):
+        self.sticky = sticky
+        self.wrote = False
+
+
+def sticky_seconds():
+    return getattr(settings, 'CATALOG_REPLICA_STICKY_SECONDS', 10)
+
+
+def replica_alias():
+    """Alias da réplica, ou None se não houver uma separada do primário."""
+    if REPLICA not in settings.DATABASES:
+        return None
+    if connections[REPLICA].settings_dict['NAME'] == connections[PRIMARY].settings_dict['NAME']:
+        return None
+    return REPLICA
+
+
+@contextmanager
+def replica():
+    """Leituras do bloco na réplica (salvo gravação recente)."""
+    token = _replica.set(True)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def rendered(response):
+    """Renderiza uma TemplateResponse já: as consultas preguiçosas feitas
+       pelo modelo (ex.: a página de uma ListView) ficam no mesmo contexto."""
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    return response
+
+
+def replica_reads(view):
+    """Decorator de view: leituras na réplica.  Aceita views assíncronas."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def inner(*args, **kwargs):
+            with replica():
+                return await view(*args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def inner(*args, **kwargs):
+            with replica():
+                return rendered(view(*args, **kwargs))
+    return inner
+
+
+def replica_iter(iterable):
+    """Itera 'iterable' lendo da réplica (respostas em fluxo são geradas
+       depois que a view retorna, fora do decorator)."""
+    with replica():
+        yield from iterable
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APPS:
+            return None
+        routing = _request.get()
+        if not _replica.get() or (routing is not None and (routing.sticky or routing.wrote)):
+            return PRIMARY
+        return replica_alias() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        routing = _request.get()
+        if routing is not None:
+            routing.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mesmos dados nas duas bases
+        if {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # A réplica recebe o esquema do primário pela replicação
+        if db == REPLICA:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Estado de roteamento de cada requisição e cookie de leitura no
+       primário após gravações.  Funciona em WSGI e ASGI."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        routing = RequestRouting(sticky=STICKY_COOKIE in request.COOKIES)
+        token = _request.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self.finish(request, response, routing)
+
+    async def __acall__(self, request):
+        routing = RequestRouting(sticky=STICKY_COOKIE in request.COOKIES)
+        token = _request.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self.finish(request, response, routing)
+
+    @staticmethod
+    def finish(request, response, routing):
+        seconds = sticky_seconds()
+        if routing.wrote and request.method not in SAFE_METHODS and seconds:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
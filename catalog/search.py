@@ -0,0 +1,151 @@
+"""Busca textual do catálogo usando uma tabela virtual FTS5 do SQLite.
+
+Cada livro tem uma linha em catalog_book_fts (rowid = id do livro) com
+título, resumo, autor, gêneros e idioma.  O índice é mantido pelos sinais
+em catalog/signals.py e pode ser reconstruído com 'rebuild_search_index'.
+Em outras bases de dados a busca recai em 'icontains'.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Book
+
+FTS_TABLE = 'catalog_book_fts'
+
+# Pesos do bm25 na ordem das colunas: título, resumo, autor, gênero, idioma
+BM25_WEIGHTS = (10.0, 1.0, 5.0, 2.0, 2.0)
+
+CREATE_SQL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    "title, summary, author, genre, language, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+DROP_SQL = f'DROP TABLE IF EXISTS {FTS_TABLE}'
+
+BATCH_SIZE = 1000
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def _documents(books):
+    """Linhas (rowid, título, resumo, autor, gêneros, idioma) p/ o índice."""
+    for book in books:
+        author = f'{book.author.first_name} {book.author.last_name}' if book.author else ''
+        yield (
+            book.id,
+            book.title,
+            book.summary,
+            author,
+            ' '.join(genre.name for genre in book.genre.all()),
+            book.language.name if book.language else '',
+        )
+
+
+def _indexable(queryset):
+    return queryset.select_related('author', 'language').prefetch_related('genre')
+
+
+def _write(cursor, books):
+    cursor.executemany(
+        f'INSERT INTO {FTS_TABLE} (rowid, title, summary, author, genre, language) '
+        'VALUES (%s, %s, %s, %s, %s, %s)',
+        list(_documents(books)),
+    )
+
+
+def index_books(book_ids):
+    """(Re)indexa os livros indicados; ids inexistentes são removidos."""
+    book_ids = list(book_ids)
+    if not book_ids or not fts_available():
+        return
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(book_ids), BATCH_SIZE):
+            batch = book_ids[start:start + BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                           batch)
+            _write(cursor, _indexable(Book.objects.filter(pk__in=batch)))
+
+
+def remove_books(book_ids):
+    book_ids = list(book_ids)
+    if not book_ids or not fts_available():
+        return
+
+    with connection.cursor() as cursor:
+        placeholders = ', '.join(['%s'] * len(book_ids))
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                       book_ids)
+
+
+def rebuild_index():
+    """Apaga e recria todo o índice; retorna o número de livros indexados."""
+    if not fts_available():
+        return 0
+
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(DROP_SQL)
+        cursor.execute(CREATE_SQL)
+        queryset = _indexable(Book.objects.order_by('pk'))
+        last_pk = 0
+        # Lotes por chave primária: memória constante em catálogos grandes
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:BATCH_SIZE])
+            if not batch:
+                break
+            _write(cursor, batch)
+            total += len(batch)
+            last_pk = batch[-1].pk
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def build_match_query(text):
+    """Converte o texto do usuário numa expressão MATCH segura.
+
+       Cada palavra vira um termo entre aspas com busca por prefixo, e todas
+       precisam aparecer (E lógico): 'dom casm' -> '"dom"* "casm"*'."""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(text, limit=None):
+    """Livros que correspondem a 'text', do mais ao menos relevante."""
+    limit = limit or getattr(settings, 'CATALOG_SEARCH_LIMIT', 50)
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    if not fts_available():
+        return list(_fallback(text)[:limit])
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+            [match, limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    books = Book.objects.select_related('author').in_bulk(ids)
+    return [books[pk] for pk in ids if pk in books]
+
+
+def _fallback(text):
+    """Busca simples p/ bases sem FTS5 (varre a tabela)."""
+    condition = Q()
+    for word in re.findall(r'\w+', text):
+        condition &= (
+            Q(title__icontains=word) | Q(summary__icontains=word)
+            | Q(author__first_name__icontains=word) | Q(author__last_name__icontains=word)
+            | Q(genre__name__icontains=word) | Q(language__name__icontains=word)
+        )
+    return Book.objects.filter(condition).select_related('author').distinct().order_by('title')
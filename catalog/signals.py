@@ -0,0 +1,174 @@
+"""Sinais que mantêm os dados derivados do catálogo em dia."""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import analytics, availability, counters, directory, lookups, object_cache, search
+from .models import Author, Book, BookInstance, Genre, Language
+
+
+def _loaded(instance, attname):
+    """Valor de 'attname' gravado na base (antes de uma edição não salva)."""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    return loaded.get(attname, getattr(instance, attname))
+
+
+def _touch(model, pks):
+    """Atualiza 'updated_at' sem passar por save() (ETag das páginas que
+       mostram dados relacionados, ver catalog/conditional.py)."""
+    pks = {pk for pk in pks if pk is not None}
+    if pks:
+        model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(counters.BOOKS)
+    search.index_books([instance.pk])
+
+    # Autor atual e, se o livro trocou de autor, o anterior
+    previous_author = _loaded(instance, 'author_id')
+    if not created and previous_author != instance.author_id:
+        _touch(Author, [previous_author])
+    object_cache.invalidate('book', [instance.pk])
+    object_cache.invalidate('author', [instance.author_id, previous_author])
+    instance.remember_loaded_values()
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    counters.increment(counters.BOOKS, -1)
+    search.remove_books([instance.pk])
+    _touch(Author, [_loaded(instance, 'author_id')])
+    object_cache.invalidate('book', [instance.pk])
+    object_cache.invalidate('author', [_loaded(instance, 'author_id')])
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Alterado pelo lado do gênero (genre.book_set): guarda os livros antes
+    #  de limpar a relação, pois depois não é mais possível encontrá-los
+    if reverse and action == 'pre_clear':
+        instance._search_book_ids = list(instance.book_set.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        book_ids = [instance.pk]
+    elif action == 'post_clear':
+        book_ids = getattr(instance, '_search_book_ids', [])
+    else:
+        book_ids = pk_set
+    search.index_books(book_ids)
+    _touch(Book, book_ids)
+    object_cache.invalidate('book', book_ids)
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(counters.AUTHORS)
+        directory.add([instance])
+        instance.remember_loaded_values()
+        return
+
+    # Índice A–Z da listagem de autores
+    if getattr(instance, '_loaded_values', None) is None:
+        # Instância não veio da base (nome anterior desconhecido)
+        directory.rebuild()
+    elif any(_loaded(instance, name) != getattr(instance, name)
+             for name in ('last_name', 'first_name')):
+        directory.renamed(directory.letter(_loaded(instance, 'last_name')), instance)
+
+    # Nome do autor faz parte do índice de busca e da página dos seus livros
+    book_ids = list(instance.book_set.values_list('pk', flat=True))
+    search.index_books(book_ids)
+    object_cache.invalidate('author', [instance.pk])
+    object_cache.invalidate('book', book_ids)
+    instance.remember_loaded_values()
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    counters.increment(counters.AUTHORS, -1)
+    directory.remove([(directory.letter(_loaded(instance, 'last_name')), instance.pk)])
+    object_cache.invalidate('author', [instance.pk])
+
+
+@receiver(post_save, sender=BookInstance)
+def bookinstance_saved(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None)
+
+    if created:
+        counters.increment(counters.INSTANCES)
+        counters.increment(counters.INSTANCES_AVAILABLE,
+                           int(instance.status == 'd'))
+    elif loaded is not None and 'status' in loaded:
+        # Mudança de situação: disponível <-> outro estado
+        was_available = loaded['status'] == 'd'
+        is_available = instance.status == 'd'
+        counters.increment(counters.INSTANCES_AVAILABLE,
+                           int(is_available) - int(was_available))
+    else:
+        # Instância não veio da base (situação anterior desconhecida)
+        counters.refresh(counters.INSTANCES_AVAILABLE)
+
+    # Disponibilidade dos livros (também atualiza 'updated_at' deles)
+    previous_book = _loaded(instance, 'book_id')
+    if created:
+        availability.moved([(None, None, instance.book_id, instance.status)])
+    elif loaded is not None and 'status' in loaded:
+        availability.moved([(previous_book, loaded['status'], instance.book_id, instance.status)])
+    else:
+        availability.refresh([instance.book_id])
+    availability.copies_changed([instance.book_id, previous_book])
+
+    # Registro de circulação (empréstimo, devolução, renovação...); sem o
+    #  estado anterior (instância não veio da base) não há o que comparar
+    if created or loaded is not None:
+        old = {} if created else {name: _loaded(instance, name) for name in analytics.TRACKED}
+        new = {name: getattr(instance, name) for name in analytics.TRACKED}
+        analytics.record([analytics.build(instance.pk, instance.book_id, old, new)])
+
+    # O estado salvo passa a ser o novo estado "carregado"
+    instance.remember_loaded_values()
+
+
+@receiver(post_delete, sender=BookInstance)
+def bookinstance_deleted(sender, instance, **kwargs):
+    counters.increment(counters.INSTANCES, -1)
+
+    # Usa a situação gravada na base, não uma possível edição não salva
+    if _loaded(instance, 'status') == 'd':
+        counters.increment(counters.INSTANCES_AVAILABLE, -1)
+    availability.moved([(_loaded(instance, 'book_id'), _loaded(instance, 'status'), None, None)])
+    availability.copies_changed([_loaded(instance, 'book_id')])
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Language)
+def lookup_saved(sender, instance, created, **kwargs):
+    lookups.invalidate()
+    if not created:
+        book_ids = list(instance.book_set.values_list('pk', flat=True))
+        search.index_books(book_ids)
+        _touch(Book, book_ids)
+        object_cache.invalidate('book', book_ids)
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Language)
+def lookup_deleting(sender, instance, **kwargs):
+    # Livros afetados, lidos antes que a remoção desfaça as relações
+    instance._search_book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Language)
+def lookup_deleted(sender, instance, **kwargs):
+    lookups.invalidate()
+    book_ids = getattr(instance, '_search_book_ids', [])
+    search.index_books(book_ids)
+    _touch(Book, book_ids)
+    object_cache.invalidate('book', book_ids)
@@ -0,0 +1,62 @@
+"""Ajustes de cada conexão SQLite (PRAGMAs), conforme CATALOG_DB_PROFILE.
+
+'tuned' (padrão): WAL, em que leitores não esperam pelo escritor;
+synchronous=NORMAL (seguro com WAL: uma queda de energia pode perder só as
+últimas transações, nunca corromper a base); espera por travas; leitura
+por mmap e cache de páginas maior.
+
+'plain': comportamento padrão do SQLite (journal DELETE, synchronous FULL),
+usado como comparação pelo comando bench_database.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PROFILES = {
+    'tuned': (
+        ('busy_timeout', 5000),
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('mmap_size', 128 * 1024 * 1024),
+        # Negativo: tamanho em KiB (64 MiB)
+        ('cache_size', -64 * 1024),
+        ('temp_store', 'MEMORY'),
+    ),
+    'plain': (
+        ('busy_timeout', 5000),
+        ('journal_mode', 'DELETE'),
+        ('synchronous', 'FULL'),
+        ('mmap_size', 0),
+        ('cache_size', -2000),
+        ('temp_store', 'DEFAULT'),
+    ),
+}
+
+
+def profile():
+    return getattr(settings, 'CATALOG_DB_PROFILE', 'tuned')
+
+
+def pragmas(connection):
+    """Valores atuais dos PRAGMAs do perfil, p/ conferência."""
+    with connection.cursor() as cursor:
+        values = {}
+        for name, _ in PROFILES['tuned']:
+            cursor.execute(f'PRAGMA {name}')
+            values[name] = cursor.fetchone()[0]
+    return values
+
+
+@receiver(connection_created)
+def configure(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # Réplica somente leitura (mode=ro): o modo do journal é do primário
+    read_only = 'mode=ro' in str(connection.settings_dict['NAME'])
+    cursor = connection.connection.cursor()
+    try:
+        for name, value in PROFILES[profile()]:
+            if not (read_only and name == 'journal_mode'):
+                cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
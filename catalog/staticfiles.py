@@ -0,0 +1,138 @@
+"""Arquivos estáticos: nomes com hash, versões comprimidas e o handler.
+
+CompressedManifestStaticFilesStorage (STORAGES['staticfiles']) grava no
+collectstatic os arquivos com o hash do conteúdo no nome (css/styles.css ->
+css/styles.<hash>.css) e, p/ os arquivos de texto, versões .gz e .br (esta
+só com o pacote 'brotli' instalado) ao lado do original.
+
+serve() entrega os arquivos de STATIC_ROOT sem servidor web à frente (ex.:
+quiosques das filiais): escolhe a versão comprimida conforme o
+Accept-Encoding e marca os arquivos com hash como imutáveis (cache de um
+ano, o nome muda quando o conteúdo muda).  Com DEBUG, usa os arquivos dos
+apps, como o runserver.
+"""
+import gzip
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import views as staticfiles_views
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Arquivos de texto: os únicos que valem a pena comprimir
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.txt', '.json', '.xml', '.html')
+# Abaixo disso a versão comprimida quase não economiza nada
+MIN_SIZE = 128
+
+# Em ordem de preferência
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Nome sem hash: o conteúdo pode mudar a qualquer collectstatic
+REVALIDATE = 'public, max-age=0, must-revalidate'
+
+
+def compress(content):
+    """{extensão: conteúdo comprimido} p/ as codificações disponíveis."""
+    # mtime fixo: a mesma entrada gera sempre o mesmo arquivo
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que também grava as versões .gz/.br."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for name in sorted({*paths, *self.hashed_files.values()}):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                self._compress(name)
+
+    def _compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_SIZE:
+            return
+        for suffix, compressed in compress(content).items():
+            # Só quando compensa (ex.: arquivo já minificado e pequeno)
+            if len(compressed) < len(content) * 0.9:
+                Path(self.path(name + suffix)).write_bytes(compressed)
+
+    def stored_name(self, name):
+        # Sem collectstatic (desenvolvimento, testes) não há manifesto: usa o
+        #  nome original em vez de falhar em cada página
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+
+def _accepted(header):
+    """Codificações aceitas pelo cliente (q > 0) no Accept-Encoding."""
+    accepted = set()
+    for part in header.split(','):
+        encoding, _, params = part.strip().partition(';')
+        quality = re.search(r'q=([0-9.]+)', params)
+        try:
+            if quality and float(quality.group(1)) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def _is_hashed(path):
+    return path in getattr(staticfiles_storage, 'hashed_files', {}).values()
+
+
+@require_safe
+def serve(request, path):
+    """Entrega um arquivo de STATIC_ROOT (ver a descrição do módulo)."""
+    if settings.DEBUG:
+        return staticfiles_views.serve(request, path)
+
+    try:
+        fullpath = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404(path)
+    if not path or not fullpath.is_file():
+        raise Http404(path)
+
+    accepted = _accepted(request.headers.get('Accept-Encoding', ''))
+    encoding, chosen = None, fullpath
+    for name, suffix in ENCODINGS:
+        variant = fullpath.with_name(fullpath.name + suffix)
+        if name in accepted and variant.is_file():
+            encoding, chosen = name, variant
+            break
+
+    stat = chosen.stat()
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type, _ = mimetypes.guess_type(fullpath.name)
+        response = FileResponse(chosen.open('rb'),
+                                content_type=content_type or 'application/octet-stream')
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = IMMUTABLE if _is_hashed(path) else REVALIDATE
+    return response
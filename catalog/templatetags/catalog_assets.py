@@ -0,0 +1,18 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from catalog import assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendored_stylesheet(name):
+    """<link> p/ a folha de estilos de terceiros 'name' (catalog/assets.py):
+       do próprio site quando já baixada, da CDN de origem caso contrário."""
+    asset = assets.VENDORED[name]
+    if assets.is_vendored(name):
+        return format_html('<link href="{}" rel="stylesheet">', static(asset.path))
+    return format_html('<link href="{}" rel="stylesheet" integrity="{}" crossorigin="anonymous">',
+                       asset.url, asset.integrity)
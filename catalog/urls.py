@@ -12,10 +12,15 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('books/', views.BookListView.as_view(), name='books'),
     path('book/<int:pk>', views.BookDetailView.as_view(), name='book-detail'),
+    path('search/', views.search, name='search'),
     path('authors/', views.AuthorListView.as_view(), name='authors'),
     path('author/<int:pk>', views.AuthorDetailView.as_view(), name='author-detail'),
     path('mybooks/', views.LoanedBookByUserListView.as_view(), name='my-borrowed'),
     #path('borrowed/', views.AllBorrowedBooks.as_view(), name='borrowed-books'),
     path('borrowed/', views.all_borrowed_books, name='borrowed-books'),
+    path('export/<slug:kind>.<slug:fmt>', views.export, name='catalog-export'),
+    path('overdue/', views.overdue_loans, name='overdue-loans'),
+    path('reports/circulation/', views.circulation_report, name='circulation-report'),
+    path('api/<slug:resource>/', views.api, name='api'),
     path('book/<uuid:pk>/renew/', views.renew_book_librarian, name='renew-book-librarian'),
 ]
@@ -1,49 +1,102 @@
-import datetime
+from urllib.parse import urlencode
 
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponseRedirect
+from django.conf import settings
+from django.http import (Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden,
+                         HttpResponseRedirect, JsonResponse, StreamingHttpResponse)
+from django.utils.crypto import constant_time_compare
 from django.urls import reverse
+from django.db.models import Prefetch
 from django.views import generic
-from django.core.paginator import Paginator
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.contrib import messages
 from django.contrib.auth.decorators import permission_required
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import conditional_page, require_safe
 
 from .models import Book, Author, BookInstance, Genre
-from catalog.forms import RenewBookForm
+from catalog.forms import BulkLoanForm, RenewBookForm, ReportPeriodForm
+from catalog import (analytics, api as catalog_api, circulation, conditional, counters, directory,
+                     exports, lookups, metrics as catalog_metrics, object_cache, routers,
+                     search as catalog_search, visits)
+from catalog.pagination import KeysetPaginationMixin, paginate
 
+@routers.replica_reads
 def index(request):
     """Tela inicial p/ Biblioteca Local"""
 
-    # Gera a quantidade de alguns dos objetos principais
-    num_books = Book.objects.all().count()
-    num_instances = BookInstance.objects.all().count()
+    # Quantidade dos objetos principais, lida dos contadores materializados
+    #  (uma única consulta, independente do tamanho do catálogo)
+    counts = counters.get_counts()
 
-    # Livros disponíveis (status = 'd')
-    num_instances_available = BookInstance.objects.filter(status__exact='d').count()
-
-    # 'all()' está implícito
-    num_authors = Author.objects.count()
-
-    # Número de visitantes dessa página, contado variável session
-    num_visits = request.session.get('num_visits', 0)
-    num_visits += 1
-    request.session['num_visits'] =  num_visits
+    # Número de visitas desse visitante, num cookie assinado: a página não
+    #  cria nem grava sessão.  O total do site é gravado em lotes
+    num_visits = visits.visitor_count(request) + 1
+    visits.site_visits.hit()
 
     context = {
-        'num_books': num_books,
-        'num_instances': num_instances,
-        'num_instances_available': num_instances_available,
-        'num_authors': num_authors,
+        'num_books': counts[counters.BOOKS],
+        'num_instances': counts[counters.INSTANCES],
+        'num_instances_available': counts[counters.INSTANCES_AVAILABLE],
+        'num_authors': counts[counters.AUTHORS],
         'num_visits': num_visits,
+        'num_site_visits': visits.total(counts.get(counters.SITE_VISITS, 0)),
     }
 
     # Renderiza o modelo HTML index.html com os dados na variável context
-    return render(request, 'index.html', context=context)
+    response = render(request, 'index.html', context=context)
+    visits.set_visitor_count(response, num_visits)
+    return response
+
+
+# Ordenações da listagem de livros (?sort=...), cada uma com seu índice
+BOOK_ORDERINGS = {
+    'title': ('title', 'id'),
+    'available': ('-copies_available', 'title', 'id'),
+}
+
+
+def book_list_query(params):
+    """(consulta, ordenação, contexto) da listagem de livros conforme
+       ?sort= e ?available=1 (apenas livros com cópias disponíveis).
+
+       A disponibilidade vem dos contadores do próprio livro: nenhuma
+       contagem de cópias por livro."""
+    sort = params.get('sort') if params.get('sort') in BOOK_ORDERINGS else 'title'
+    available_only = params.get('available') == '1'
+
+    # Autor de cada livro na mesma consulta da listagem
+    books = Book.objects.select_related('author')
+    if available_only:
+        books = books.filter(copies_available__gt=0)
 
+    query = {}
+    if sort != 'title':
+        query['sort'] = sort
+    if available_only:
+        query['available'] = '1'
+    context = {
+        'sort': sort,
+        'available_only': available_only,
+        # Mantém ordenação e filtro nos links de página
+        'pagination_query': urlencode(query),
+    }
+    return books.order_by(*BOOK_ORDERINGS[sort]), BOOK_ORDERINGS[sort], context
 
-class BookListView(generic.ListView):
+
+@method_decorator(routers.replica_reads, name='dispatch')
+@method_decorator(conditional.page(conditional.book_list), name='dispatch')
+class BookListView(KeysetPaginationMixin, generic.ListView):
     model = Book
     paginate_by = 10
+    keyset_ordering = BOOK_ORDERINGS['title']
+
+    def get_queryset(self):
+        queryset, self.keyset_ordering, self.list_options = book_list_query(self.request.GET)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(**kwargs) | self.list_options
     #context_object_name = 'book_list' # Nome próprio p/ a lista como uma variável modelo
     #queryset = Book.objects.filter(title__icontains='lord')[:5] # Recolhe 5 livros contendo a palavra no título
     #template_name = 'books/my_arbitrary_temple_name_list.html' # Especifique seu próprio caminho p/ o modelo
@@ -60,67 +113,232 @@ class BookListView(generic.ListView):
     #     return context
 
     
+@method_decorator(conditional.page(conditional.book_detail), name='dispatch')
 class BookDetailView(generic.DetailView):
     model = Book
 
+    def get_queryset(self):
+        # Autor na mesma consulta; cópias em uma consulta, qualquer que seja
+        #  o número de cópias.  Gêneros e idioma vêm de catalog/lookups.py
+        return (
+            Book.objects.select_related('author')
+            .prefetch_related(
+                Prefetch('bookinstance_set',
+                         queryset=BookInstance.objects.order_by('due_back', 'id')),
+            )
+        )
+
+    def get_object(self, queryset=None):
+        # Livro já montado (com gêneros e cópias) vem do cache de objetos,
+        #  invalidado pelos sinais quando o livro ou suas cópias mudam
+        def build():
+            book = super(BookDetailView, self).get_object(queryset)
+            lookups.attach([book])
+            return book
+        return object_cache.get_or_build('book', self.kwargs['pk'], build)
 
+
+@method_decorator(conditional.page(conditional.author_detail), name='dispatch')
 class AuthorDetailView(generic.DetailView):
     model = Author
     # Modelo html padrão em templates/catalog/author_detail.html
 
+    def get_queryset(self):
+        # Livros do autor; o número de cópias vem dos contadores do livro
+        books = Book.objects.order_by('title')
+        return Author.objects.prefetch_related(Prefetch('book_set', queryset=books))
+
+    def get_object(self, queryset=None):
+        return object_cache.get_or_build(
+            'author', self.kwargs['pk'], lambda: super(AuthorDetailView, self).get_object(queryset))
+
 
-class AuthorListView(generic.ListView):
+@method_decorator(routers.replica_reads, name='dispatch')
+@method_decorator(conditional.page(conditional.author_list), name='dispatch')
+class AuthorListView(KeysetPaginationMixin, generic.ListView):
+    """Autores paginados por busca, com o índice A–Z (catalog/directory.py)."""
     model = Author
     # Template padrão em templates/catalog/author_list.html
+    paginate_by = 20
+    keyset_ordering = directory.ORDERING
+    # Os saltos por letra são cursores: sempre paginação por busca
+    keyset_only = True
+
+    def get_queryset(self):
+        self.letters = directory.letters()
+        return Author.objects.order_by(*directory.ORDERING)
+
+    def get_keyset_count(self):
+        # Total somado do índice de letras, sem COUNT(*)
+        return sum(count for _, count, _ in self.letters)
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(letters=self.letters, **kwargs)
 
     
-class LoanedBookByUserListView(LoginRequiredMixin, generic.ListView):
+class LoanedBookByUserListView(LoginRequiredMixin, KeysetPaginationMixin,
+                               generic.ListView):
     """Listagem de livros emprestados com base em classe genérica."""
     model = BookInstance
     template_name = 'catalog/bookinstance_list_borrowed_user.html'
     paginate_by = 10
+    keyset_ordering = ('due_back', 'id')
 
     def get_queryset(self):
         return (
-            BookInstance.objects.filter(borrower=self.request.user)
-            .filter(status__exact='e')
-            .order_by('due_back')
+            BookInstance.objects.on_loan()
+            .filter(borrower=self.request.user)
+            .select_related('book')
+            .order_by('due_back', 'id')
         )
 
 
 # Para a visualização de todos livros emprestados, quero fazer em forma
 #  de função, mas deixarei a forma de classe implementada
-class AllBorrowedBooks(PermissionRequiredMixin, generic.ListView):
+class AllBorrowedBooks(PermissionRequiredMixin, KeysetPaginationMixin,
+                       generic.ListView):
     """Listagem de todos os livros emprestados."""
     permission_required = 'catalog.can_mark_returned'
     model = BookInstance
     template_name = 'catalog/all_borrowed_books.html'
     paginate_by = 10
+    keyset_ordering = ('due_back', 'id')
 
     def get_queryset(self):
         return (
-            BookInstance.objects.filter(status__exact='e')
-            .order_by('due_back')
+            BookInstance.objects.on_loan()
+            .select_related('book', 'borrower')
+            .order_by('due_back', 'id')
         )
 
 
 @permission_required('catalog.can_mark_returned')
+@routers.replica_reads
 def all_borrowed_books(request):
-    bookinstance_list = BookInstance.objects.filter(status__exact='e').order_by('due_back')
+    # Renovação/devolução em lote das cópias marcadas (ou de um usuário)
+    if request.method == 'POST':
+        bulk_form = BulkLoanForm(request.POST)
+        if bulk_form.is_valid():
+            report_bulk_result(request, apply_bulk_form(bulk_form))
+            return HttpResponseRedirect(request.get_full_path())
+    else:
+        bulk_form = BulkLoanForm(initial={
+            'renewal_date': circulation.default_renewal_date()})
 
-    paginator = Paginator(bookinstance_list, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    bookinstance_list = (
+        BookInstance.objects.on_loan()
+        .select_related('book', 'borrower')
+        .order_by('due_back', 'id')
+    )
+
+    # Paginação por deslocamento ou por busca (CATALOG_KEYSET_PAGINATION)
+    page_obj = paginate(request, bookinstance_list, 10, ('due_back', 'id'))
 
     context = {
-        'bookinstance_list': bookinstance_list,
+        'bookinstance_list': page_obj.object_list,
         'page_obj': page_obj,
+        'paginator': page_obj.paginator,
+        'is_paginated': page_obj.has_other_pages(),
+        'bulk_form': bulk_form,
     }
 
     return render(request, 'catalog/all_borrowed_books.html', context=context)
 
+
+def apply_bulk_form(form):
+    """Executa a operação de um BulkLoanForm válido."""
+    data = form.cleaned_data
+    target = {'ids': data['ids']} if data['ids'] else {'borrower': data['borrower']}
+    if data['action'] == BulkLoanForm.RENEW:
+        return circulation.renew(data['renewal_date'], **target)
+    return circulation.check_in(**target)
+
+
+def report_bulk_result(request, result):
+    """Resumo e resultado de cada cópia que não pôde ser alterada."""
+    if result.done:
+        messages.success(request, f'{len(result.done)} cópia(s) atualizada(s).')
+    for pk, label in result.describe():
+        if pk in result.failed:
+            messages.warning(request, f'{pk}: {label}')
+    if not result.outcomes:
+        messages.info(request, 'Nenhuma cópia emprestada encontrada.')
+
+
+@permission_required('catalog.can_mark_returned')
+@routers.replica_reads
+def overdue_loans(request):
+    """Empréstimos atrasados agrupados por solicitante (filtro na base)."""
+    overdue_list = (
+        BookInstance.objects.overdue()
+        .select_related('book', 'borrower')
+        .order_by('borrower', 'due_back', 'id')
+    )
+    page_obj = paginate(request, overdue_list, 50, ('borrower', 'due_back', 'id'))
+
+    context = {
+        'bookinstance_list': page_obj.object_list,
+        'page_obj': page_obj,
+        'paginator': page_obj.paginator,
+        'is_paginated': page_obj.has_other_pages(),
+    }
+
+    return render(request, 'catalog/overdue_loans.html', context=context)
+
+
+@permission_required('catalog.can_mark_returned')
+@routers.replica_reads
+def circulation_report(request):
+    """Empréstimos por mês, gênero e idioma, maiores solicitantes e uso das
+       cópias no intervalo pedido.  Lê apenas os totais diários (ver
+       catalog/analytics.py): o custo depende do intervalo, não do histórico."""
+    form = ReportPeriodForm(request.GET)
+    report = None
+    if form.is_valid():
+        report = analytics.report(form.cleaned_data['start'], form.cleaned_data['end'])
+
+    context = {
+        'form': form,
+        'report': report,
+    }
+
+    return render(request, 'catalog/circulation_report.html', context=context)
+
+
+def search(request):
+    """Busca textual no catálogo (título, resumo, autor, gênero e idioma)."""
+    query = request.GET.get('q', '').strip()
+    results = catalog_search.search(query) if query else []
+
+    context = {
+        'query': query,
+        'book_list': results,
+    }
+
+    return render(request, 'catalog/search_results.html', context=context)
+
+
+@permission_required('catalog.can_mark_returned')
+def export(request, kind, fmt):
+    """Exporta livros, cópias ou autores em CSV/JSONL, em fluxo."""
+    if kind not in exports.EXPORTS or fmt not in exports.FORMATS:
+        raise Http404('Exportação desconhecida')
+
+    try:
+        filters = exports.parse_filters(request.GET)
+    except exports.ExportError as error:
+        return HttpResponseBadRequest(str(error))
+
+    response = StreamingHttpResponse(routers.replica_iter(exports.stream(kind, fmt, filters)),
+                                     content_type=exports.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+
+@permission_required('catalog.can_mark_returned')
 def renew_book_librarian(request, pk):
-    book_instance = get_object_or_404(BookInstance, pk=pk)
+    book_instance = get_object_or_404(BookInstance.objects.select_related('book', 'borrower'),
+                                      pk=pk)
 
     # Caso seja POST, processe os dados do formulário
     if request.method == 'POST':
@@ -131,17 +349,17 @@ def renew_book_librarian(request, pk):
         # Verifique se o formulário é válido
         if form.is_valid():
             # Processe os dados em form.cleaned_data conforme necessário
-            #  aqui é apenas verificado a data de renovação
-            book_instance.due_back = form.cleaned_data['renewal_date']
-            book_instance.save()
+            #  aqui é apenas atualizada a data de renovação (UPDATE de uma
+            #  coluna, mesmo caminho da renovação em lote)
+            result = circulation.renew(form.cleaned_data['renewal_date'], ids=[book_instance.pk])
+            report_bulk_result(request, result)
 
             # Redirecione para uma nova URL
-            return HttpResponseRedirect(reverse('all-borrowed'))
+            return HttpResponseRedirect(reverse('borrowed-books'))
 
     # Caso seja GET (ou outros), produza um formulário padrão
     else:
-        proposed_renewal_date = datetime.date.today() + datetime.timedelta(weeks=3)
-        form = RenewBookForm(initial={'renewal_date': proposed_renewal_date})
+        form = RenewBookForm(initial={'renewal_date': circulation.default_renewal_date()})
 
     context = {
         'form': form,
@@ -149,3 +367,32 @@ def renew_book_librarian(request, pk):
     }
 
     return render(request, 'catalog/book_renew_librarian.html', context)
+
+
+@require_safe
+@routers.replica_reads
+@conditional_page
+def api(request, resource):
+    """API JSON somente leitura (ver catalog/api.py).  ETag calculada sobre
+       o corpo: clientes recebem 304 quando nada mudou."""
+    try:
+        data = catalog_api.query(resource, request.GET)
+    except LookupError:
+        raise Http404('Recurso desconhecido')
+    except catalog_api.ApiError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse(data)
+
+
+def metrics(request):
+    """Métricas no formato do Prometheus, p/ equipe ou com token."""
+    token = getattr(settings, 'CATALOG_METRICS_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    authorized = bool(token) and constant_time_compare(header, f'Bearer {token}')
+
+    if not (authorized or request.user.is_staff):
+        return HttpResponseForbidden()
+
+    catalog_metrics.registry.flush(force=True)
+    return HttpResponse(catalog_metrics.render_prometheus(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
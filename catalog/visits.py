@@ -0,0 +1,98 @@
+"""Contagem de visitas sem escrita na base a cada requisição.
+
+As visitas de cada visitante ficam num cookie assinado (nenhuma sessão é
+criada).  O total do site é somado em memória por processo e gravado no
+contador 'site_visits' em lotes, a cada CATALOG_VISITS_FLUSH_INTERVAL
+segundos, e na saída do processo.  Uma falha ao gravar (ex.: base travada)
+só é registrada no log: as visitas ficam p/ o próximo lote e a página não
+falha.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import DatabaseError
+
+from . import counters
+
+logger = logging.getLogger(__name__)
+
+COOKIE_NAME = 'num_visits'
+COOKIE_SALT = 'catalog.visits'
+COOKIE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def visitor_count(request):
+    """Visitas anteriores deste visitante, lidas do cookie assinado."""
+    try:
+        return int(request.get_signed_cookie(COOKIE_NAME, default=0, salt=COOKIE_SALT,
+                                             max_age=COOKIE_MAX_AGE))
+    except (ValueError, signing.BadSignature):
+        return 0
+
+
+def set_visitor_count(response, value):
+    response.set_signed_cookie(COOKIE_NAME, str(value), salt=COOKIE_SALT,
+                               max_age=COOKIE_MAX_AGE, httponly=True, samesite='Lax')
+
+
+class SiteVisits:
+    """Acumulador de visitas deste processo, gravado periodicamente."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def _count(self):
+        """Soma a visita; True quando é hora de gravar o lote."""
+        with self.lock:
+            self.pending += 1
+            return time.monotonic() - self.last_flush >= flush_interval()
+
+    def hit(self):
+        if self._count():
+            self.flush()
+
+    async def ahit(self):
+        if self._count():
+            await sync_to_async(self.flush)()
+
+    def flush(self):
+        """Grava as visitas pendentes com um único UPDATE; True se gravou."""
+        with self.lock:
+            pending, self.pending = self.pending, 0
+            self.last_flush = time.monotonic()
+        if not pending:
+            return True
+        try:
+            counters.increment(counters.SITE_VISITS, pending)
+        except DatabaseError:
+            # Devolve as visitas p/ o próximo lote
+            with self.lock:
+                self.pending += pending
+            logger.warning('Visitas não gravadas (%d ficam p/ o próximo lote)', pending,
+                           exc_info=True)
+            return False
+        return True
+
+
+site_visits = SiteVisits()
+
+
+def flush_interval():
+    return getattr(settings, 'CATALOG_VISITS_FLUSH_INTERVAL', 30)
+
+
+def total(persisted):
+    """Total do site: valor gravado mais o pendente deste processo."""
+    return persisted + site_visits.pending
+
+
+@atexit.register
+def _flush_on_exit():
+    site_visits.flush()
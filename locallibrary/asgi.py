@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'locallibrary.settings')
+# Catalog pages served by the async views (catalog/async_views.py)
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'locallibrary.asgi_urls')
 
 application = get_asgi_application()
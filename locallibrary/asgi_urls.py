@@ -0,0 +1,14 @@
+"""
+URL configuration used under ASGI (see locallibrary/asgi.py).
+
+Same routes as locallibrary.urls, with the async catalog views from
+catalog.async_urls matched first.
+"""
+from django.urls import include, path
+
+from locallibrary.urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('catalog/', include('catalog.async_urls')),
+    *wsgi_urlpatterns,
+]
@@ -12,6 +12,10 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import hashlib
+import tempfile
+
+from locallibrary import dbconfig
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -43,6 +47,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Latência, consultas SQL e renderização por view (ver /metrics)
+    'catalog.metrics.MetricsMiddleware',
+    # Leituras na réplica e retorno ao primário após gravações
+    'catalog.routers.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -51,11 +59,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'locallibrary.urls'
+# locallibrary/asgi.py troca p/ 'locallibrary.asgi_urls' (views assíncronas)
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'locallibrary.urls')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates com medição do tempo de renderização
+        'BACKEND': 'catalog.metrics.InstrumentedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,12 +85,27 @@ WSGI_APPLICATION = 'locallibrary.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Base de dados pelo ambiente (DATABASE_URL, DB_CONN_MAX_AGE, ...):
+#  ver locallibrary/dbconfig.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': dbconfig.from_env(BASE_DIR),
 }
+# Base de testes em memória; em arquivo temporário só p/ os testes que
+#  precisam (ver locallibrary/testrunner.py)
+TEST_RUNNER = 'locallibrary.testrunner.TestRunner'
+
+# Réplica de leitura p/ listagens e relatórios (DATABASE_REPLICA_URL); leituras
+#  voltam ao primário por CATALOG_REPLICA_STICKY_SECONDS após uma gravação
+#  (ver catalog/routers.py)
+replica = dbconfig.replica_from_env(BASE_DIR, DATABASES['default'])
+if replica:
+    DATABASES['replica'] = replica
+DATABASE_ROUTERS = ['catalog.routers.ReplicaRouter']
+CATALOG_REPLICA_STICKY_SECONDS = int(os.environ.get('CATALOG_REPLICA_STICKY_SECONDS', 10))
+
+# PRAGMAs de cada conexão SQLite: 'tuned' (WAL, ...) ou 'plain' (padrão do
+#  SQLite); ver catalog/sqlite.py
+CATALOG_DB_PROFILE = os.environ.get('CATALOG_DB_PROFILE', 'tuned')
 
 
 # Password validation
@@ -119,11 +144,50 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Destino do collectstatic, servido por catalog.staticfiles.serve
+STATIC_ROOT = os.environ.get('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Nomes com hash do conteúdo e versões .gz/.br (ver catalog/staticfiles.py)
+    'staticfiles': {
+        'BACKEND': 'catalog.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache local do processo; com CATALOG_CACHE_DIR usa arquivos, compartilhados
+#  entre os processos do servidor (invalidações valem p/ todos)
+if os.environ.get('CATALOG_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CATALOG_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Validade (segundos) dos livros/autores guardados no cache de objetos
+CATALOG_OBJECT_CACHE_TIMEOUT = 60 * 60
+
+# Sessões lidas do cache e gravadas também na base (leituras sem consulta)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Intervalo (segundos) p/ gravar o total de visitas acumulado em memória
+CATALOG_VISITS_FLUSH_INTERVAL = 30
+
 # Redireciona para página inicial após login
 LOGIN_REDIRECT_URL = '/'
 
@@ -131,3 +195,25 @@ LOGIN_REDIRECT_URL = '/'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 #LOGIN_URL = 'accounts/login'
+
+# Paginação por busca (keyset/cursor) nas listagens do catálogo.  Opcional:
+#  quando desligada as listagens usam a paginação padrão (OFFSET/LIMIT)
+CATALOG_KEYSET_PAGINATION = False
+
+# Com a paginação por busca, False omite o COUNT(*) total a cada página
+CATALOG_PAGINATION_COUNT = True
+
+# Máximo de resultados da busca textual do catálogo
+CATALOG_SEARCH_LIMIT = 50
+
+# Métricas por view: diretório compartilhado entre os processos do servidor
+#  (um por instalação do projeto; os testes usam um temporário, ver
+#  locallibrary/testrunner.py), intervalo de gravação (segundos) e token
+#  aceito em /metrics (Authorization: Bearer <token>); sem token apenas a
+#  equipe tem acesso
+CATALOG_METRICS_DIR = os.environ.get(
+    'CATALOG_METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'locallibrary-metrics-'
+                 + hashlib.sha1(str(BASE_DIR).encode()).hexdigest()[:12]))
+CATALOG_METRICS_FLUSH_INTERVAL = 5
+CATALOG_METRICS_TOKEN = os.environ.get('CATALOG_METRICS_TOKEN', '')
@@ -0,0 +1,54 @@
+"""
+Executor dos testes (TEST_RUNNER).
+
+Com SQLite a base de testes fica em memória, como no padrão do Django.
+Testes que precisam de um arquivo (várias threads com conexões próprias,
+réplica somente leitura, PRAGMAs como o journal WAL) declaram
+'file_database = True'; quando algum deles é executado, a base de testes
+vai p/ um diretório temporário exclusivo desta execução, apagado no fim.
+
+As métricas (CATALOG_METRICS_DIR) também vão p/ um diretório temporário:
+os testes não se misturam às métricas do servidor.
+"""
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import iter_test_cases
+
+
+class TestRunner(DiscoverRunner):
+    file_database_dir = None
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_dir = tempfile.mkdtemp(prefix='locallibrary-metrics-test-')
+        self.metrics_dir_saved = settings.CATALOG_METRICS_DIR
+        settings.CATALOG_METRICS_DIR = self.metrics_dir
+
+    def teardown_test_environment(self, **kwargs):
+        settings.CATALOG_METRICS_DIR = self.metrics_dir_saved
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
+
+    def get_databases(self, suite):
+        self.file_database = any(getattr(test, 'file_database', False)
+                                 for test in iter_test_cases(suite))
+        return super().get_databases(suite)
+
+    def setup_databases(self, **kwargs):
+        database = connections['default'].settings_dict
+        if self.file_database and database['ENGINE'] == 'django.db.backends.sqlite3':
+            self.file_database_dir = tempfile.mkdtemp(prefix='locallibrary-test-')
+            database['TEST']['NAME'] = str(Path(self.file_database_dir) / 'test.sqlite3')
+        return super().setup_databases(**kwargs)
+
+    def teardown_databases(self, old_config, **kwargs):
+        try:
+            super().teardown_databases(old_config, **kwargs)
+        finally:
+            if self.file_database_dir:
+                shutil.rmtree(self.file_database_dir, ignore_errors=True)